@@ -0,0 +1,217 @@
+"""Password hashing, login and signed session tokens.
+
+Passwords are stored as salted scrypt hashes in the form
+``scrypt$<n>$<r>$<p>$<salt>$<hash>``.  Rows still holding the legacy unsalted
+SHA-256 hex digest are verified once more and rehashed with the current
+parameters on the next successful login.
+
+A successful login returns a session token (an HMAC-signed, expiring set of
+claims) that pages keep in ``st.session_state`` and validate without touching
+the database or rehashing the password.
+"""
+import base64
+import collections
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+
+import db
+import instrumentation
+import ratelimit
+
+
+# scrypt cost parameters; raising SCRYPT_N upgrades stored hashes at next login
+SCRYPT_N = int(os.environ.get("HARVESTPAY_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.environ.get("HARVESTPAY_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("HARVESTPAY_SCRYPT_P", "1"))
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# Set HARVESTPAY_SECRET_KEY in production so tokens survive restarts and are
+# accepted by every app process; otherwise each process signs with its own key.
+SECRET_KEY = os.environ.get("HARVESTPAY_SECRET_KEY", "").encode() or secrets.token_bytes(32)
+SESSION_TTL = 8 * 60 * 60  # seconds
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=HASH_BYTES,
+                          maxmem=256 * n * r + 1024 * 1024)
+
+
+# ------------------------------
+# PASSWORDS
+# ------------------------------
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Hashes the password using salted scrypt."""
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password, stored):
+    """Checks a password against a stored hash.
+
+    Returns ``(matches, needs_rehash)``; ``needs_rehash`` is true for legacy
+    SHA-256 hashes and for scrypt hashes made with other cost parameters.
+    """
+    if not stored:
+        return False, False
+    if not stored.startswith("scrypt$"):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        expected = _b64decode(digest)
+        actual = _scrypt(password, _b64decode(salt), n, r, p)
+    except ValueError:
+        return False, False
+    return hmac.compare_digest(actual, expected), (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+_DUMMY_HASH = None
+
+
+@instrumentation.timed("login")
+def authenticate(username, password):
+    """Verifies the username and password and returns the users row, or None.
+
+    Unknown usernames cost the same as wrong passwords, and legacy or
+    outdated hashes are upgraded in place after a successful check.
+    """
+    global _DUMMY_HASH
+    login = db.find_login(username)
+    if login is None:
+        _DUMMY_HASH = _DUMMY_HASH or hash_password(secrets.token_hex(8))
+        verify_password(password, _DUMMY_HASH)
+        return None
+    stored, user = login
+    matches, needs_rehash = verify_password(password, stored)
+    if not matches:
+        return None
+    if needs_rehash:
+        db.update_password_hash(username, stored, hash_password(password))
+    return user
+
+
+def login(username, password, client):
+    """Rate-limited :func:`authenticate` for a login attempt from ``client``.
+
+    Returns ``(user, retry_after)``: ``user`` is the User or None, and
+    ``retry_after`` is non-zero when the attempt was refused by a rate limit
+    without being checked, so throttled attempts cost no database query or
+    password hash.  Failed attempts are counted per username and client, so
+    they never lock the account's owner out from another client; a
+    successful login clears them.  ``client`` is None when the client's
+    address is unknown, which skips the per-client limit rather than pooling
+    every such client under one key.
+    """
+    account = (username, client)
+    allowed, retry_after = ratelimit.login_failures.check(account)
+    if allowed and client is not None:
+        allowed, retry_after = ratelimit.login_by_client.hit(client)
+    if not allowed:
+        instrumentation.increment("harvestpay_login_throttled_total")
+        return None, retry_after
+    user = authenticate(username, password)
+    if user:
+        ratelimit.login_failures.reset(account)
+    else:
+        ratelimit.login_failures.hit(account)
+    return user, 0.0
+
+
+def change_password(username, current_password, new_password):
+    """Replaces a user's password after checking the current one; returns whether it changed."""
+    login = db.find_login(username)
+    if login is None or not verify_password(current_password, login[0])[0]:
+        return False
+    db.update_password_hash(username, login[0], hash_password(new_password))
+    return True
+
+
+# ------------------------------
+# USERNAME AVAILABILITY
+# ------------------------------
+
+USERNAME_CACHE_SIZE = 50_000
+AVAILABLE_TTL = 60  # seconds a "not taken" answer is trusted; usernames are never freed once taken
+
+_usernames = collections.OrderedDict()  # username: (taken, checked_at), least recently used first
+_usernames_lock = threading.Lock()
+
+
+def _remember_username(username, taken):
+    with _usernames_lock:
+        _usernames[username] = (taken, time.monotonic())
+        _usernames.move_to_end(username)
+        if len(_usernames) > USERNAME_CACHE_SIZE:
+            _usernames.popitem(last=False)
+
+
+def username_available(username):
+    """Returns whether ``username`` is free to register.
+
+    Answers from an in-memory LRU cache when it can: taken names are cached
+    for good, free ones for ``AVAILABLE_TTL`` seconds (another process may
+    register them meanwhile, which the UNIQUE constraint still catches).
+    """
+    with _usernames_lock:
+        cached = _usernames.get(username)
+        if cached is not None:
+            taken, checked_at = cached
+            if taken or time.monotonic() - checked_at < AVAILABLE_TTL:
+                _usernames.move_to_end(username)
+                return not taken
+    taken = db.username_exists(username)
+    _remember_username(username, taken)
+    return not taken
+
+
+def mark_username_taken(username):
+    """Records a username registered by this process, so it stops showing as available at once."""
+    _remember_username(username, True)
+
+
+# ------------------------------
+# SESSION TOKENS
+# ------------------------------
+
+def _sign(payload):
+    return hmac.new(SECRET_KEY, payload.encode(), hashlib.sha256).digest()
+
+
+def issue_session_token(username, role, full_name=None, ttl=SESSION_TTL):
+    """Returns a signed token carrying the user's identity until it expires."""
+    claims = {"username": username, "role": role, "full_name": full_name, "exp": int(time.time()) + ttl}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_b64encode(_sign(payload))}"
+
+
+def validate_session_token(token):
+    """Returns the token's claims if its signature is valid and it has not expired, otherwise None."""
+    if not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    try:
+        if not hmac.compare_digest(_b64decode(signature), _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
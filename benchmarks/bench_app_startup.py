@@ -0,0 +1,115 @@
+"""Cold-start and rerun timing for the Streamlit app, run headless with AppTest.
+
+Each measurement runs in a fresh interpreter inside a scratch copy of the app
+(so every run creates its own database): the first script run of a session
+is the cold start, then each page is rerun ``--reruns`` times.  It also
+reports which heavy libraries the Home page pulled in beyond those Streamlit
+itself loads.  ``--compare REV`` repeats the measurement on the app as of a
+git revision, e.g. the commit before the page split:
+
+    python benchmarks/bench_app_startup.py --compare HEAD~1 --reruns 10
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "numpy", "plotly.express", "smtplib", "PIL.Image"]
+PAGES = ["Home", "Features", "Register", "Login", "Loan Application", "Feedback System"]
+
+
+# Executes app.py the way Streamlit does (compiled once, run in the script's
+# globals) and records how long each script run takes.  AppTest's own wall
+# time is mostly its polling for the finished run, so it is not used.
+TIMER_MODULE = """\
+import time
+code = None
+samples = []
+def run(script_globals):
+    global code
+    start = time.perf_counter()
+    if code is None:
+        with open("app.py", encoding="utf-8") as f:
+            code = compile(f.read(), "app.py", "exec")
+    exec(code, script_globals)
+    samples.append((time.perf_counter() - start) * 1000)
+"""
+
+
+def child(reruns):
+    """Runs inside the scratch copy and prints the timings as JSON."""
+    sys.path.insert(0, os.getcwd())
+    with open("_bench_timer.py", "w") as f:
+        f.write(TIMER_MODULE)
+    with open("_bench_app.py", "w") as f:
+        f.write("import _bench_timer\n_bench_timer.run(globals())\n")
+    from streamlit.testing.v1 import AppTest
+
+    preloaded = set(sys.modules)
+    at = AppTest.from_file(os.path.join(os.getcwd(), "_bench_app.py"), default_timeout=120)
+    at.run()
+    timer = sys.modules["_bench_timer"]
+    result = {"cold_ms": timer.samples[-1],
+              "heavy_after_home": [name for name in HEAVY_MODULES
+                                   if name in sys.modules and name not in preloaded],
+              "rerun_ms": {}}
+    for page in PAGES:
+        at.sidebar.radio[0].set_value(page).run()  # first visit may import the page
+        del timer.samples[:]
+        for _ in range(reruns):
+            at.run()
+        result["rerun_ms"][page] = statistics.median(timer.samples)
+    print(json.dumps(result))
+
+
+def measure(tree, reruns):
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in os.listdir(tree):
+            source = os.path.join(tree, name)
+            if name.endswith(".py"):
+                shutil.copy(source, tmp)
+            elif name == "views" and os.path.isdir(source):
+                shutil.copytree(source, os.path.join(tmp, name))
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", str(reruns)], cwd=tmp,
+                             env={**os.environ, "HARVESTPAY_DB": os.path.join(tmp, "bench.db"),
+                                  "HARVESTPAY_DOCUMENT_DIR": os.path.join(tmp, "documents")},
+                             capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def export_revision(rev, target):
+    archive = subprocess.run(["git", "-C", ROOT, "archive", rev], capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", target], input=archive, check=True)
+
+
+def report(label, result):
+    print(f"{label}: cold start {result['cold_ms']:.0f} ms; "
+          f"loaded on Home: {', '.join(result['heavy_after_home']) or 'none'}")
+    for page, ms in result["rerun_ms"].items():
+        print(f"  {page:<20}{ms:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--compare", metavar="REV", help="also time the app as of this git revision")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        return child(args.child)
+
+    report("working tree", measure(ROOT, args.reruns))
+    if args.compare:
+        with tempfile.TemporaryDirectory() as tree:
+            export_revision(args.compare, tree)
+            report(args.compare, measure(tree, args.reruns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Bulk import and export throughput for historical loans.
+
+Writes a synthetic loan file (CSV or Parquet) of ``--rows`` rows, one in a
+hundred invalid, imports it into a scratch database with
+``bulk.import_file`` and exports it back out with ``bulk.export_loans``.
+
+    python benchmarks/bench_bulk_import.py --rows 1000000 --format csv parquet
+"""
+import argparse
+import csv
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk  # noqa: E402
+import db  # noqa: E402
+import migrations  # noqa: E402
+
+HEADER = ["aadhaar", "name", "amount", "status", "Date", "annual_income", "repayment_months", "risk", "contributor"]
+
+
+def generate_rows(count, seed):
+    rng = random.Random(seed)
+    for i in range(count):
+        amount = "-1" if i % 100 == 99 else str(rng.randrange(5_000, 500_000, 500))
+        yield [str(100000000000 + rng.randrange(count // 4 + 1)), rng.choice(["Seeds", "Tractor", "Irrigation"]),
+               amount, rng.choice(bulk.LOAN_STATUSES),
+               f"20{rng.randint(18, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00",
+               str(rng.randrange(50_000, 1_000_000, 1_000)), rng.choice(["6", "12", "24", "36", "60"]),
+               rng.choice(bulk.RISK_LEVELS), f"contributor{rng.randrange(500)}"]
+
+
+def write_file(path, fmt, count, seed, chunk_size=100_000):
+    rows = generate_rows(count, seed)
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with pq.ParquetWriter(path, pa.schema([(name, pa.string()) for name in HEADER])) as writer:
+            while True:
+                chunk = [row for _, row in zip(range(chunk_size), rows)]
+                if not chunk:
+                    break
+                writer.write_table(pa.Table.from_pylist([dict(zip(HEADER, row)) for row in chunk]))
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", nargs="+", choices=["csv", "parquet"], default=["csv"])
+    parser.add_argument("--chunk-size", type=int, default=bulk.CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    # Every chunk's executemany is over the slow-query threshold; keep the output to the table
+    logging.getLogger("harvestpay.slow_query").setLevel(logging.ERROR)
+
+    print(f"{'format':<9}{'rows':>10}{'imported':>10}{'rejected':>10}{'import s':>10}{'rows/s':>10}{'export s':>10}")
+    for fmt in args.format:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, f"loans.{fmt}")
+            write_file(source, fmt, args.rows, args.seed)
+            db.configure(os.path.join(tmp, "bench.db"))
+            migrations.migrate()
+
+            start = time.perf_counter()
+            imported, rejected, _ = bulk.import_file("loans", source, fmt, args.chunk_size)
+            import_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            bulk.export_loans(os.path.join(tmp, f"export.{fmt}"), fmt, args.chunk_size)
+            export_seconds = time.perf_counter() - start
+            db.get_pool().close()
+        print(f"{fmt:<9}{args.rows:>10}{imported:>10}{rejected:>10}{import_seconds:>10.1f}"
+              f"{imported / import_seconds:>10.0f}{export_seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Throughput benchmark for batch credit scoring.
+
+For each portfolio size, times the end-to-end ``rescore_loans`` job against a
+scratch database, the ``credit_scoring.score_batch`` land lookup it runs, and
+the per-applicant ``calculate_credit_score`` loop over a sample (the loop is
+O(N) per call, so the full portfolio is extrapolated).
+
+    python benchmarks/bench_credit_scoring.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import credit_scoring  # noqa: E402
+import db  # noqa: E402
+import migrations  # noqa: E402
+
+CROPS = np.array(["Rice", "Wheat", "Sugarcane", "Cotton", "Millet", "Pulses"])
+
+
+def make_portfolio(size, rng):
+    aadhaar = rng.choice(np.arange(100000000000, 100000000000 + size * 2), size=size, replace=False)
+    land = pd.DataFrame({"aadhaar_number": aadhaar,
+                         "land_size": rng.uniform(0.5, 40, size).round(1),
+                         "crop_type": rng.choice(CROPS, size)})
+    # A tenth of the applicants have no land record
+    applicants = np.concatenate([aadhaar[: size - size // 10], aadhaar[: size // 10] + 1])
+    return land, applicants.astype(str)
+
+
+def bench_rescore(land, applicants):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "bench.db"))
+        migrations.migrate()
+        with db.transaction() as conn:
+            conn.executemany("INSERT INTO land_records (aadhaar, land_size, crop_type) VALUES (?, ?, ?)",
+                             zip(land["aadhaar_number"].astype(str), land["land_size"].tolist(),
+                                 land["crop_type"].tolist()))
+            conn.executemany("INSERT INTO loan_history (aadhaar, name, amount, status) VALUES (?, 'Seeds', 10000, 'Pending')",
+                             ((a,) for a in applicants))
+        start = time.perf_counter()
+        credit_scoring.rescore_loans()
+        elapsed = time.perf_counter() - start
+        db.get_pool().close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--sample", type=int, default=200, help="applicants scored with the per-call loop")
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    print(f"{'applicants':>12}{'db job s':>10}{'db job/s':>12}{'batch s':>10}{'batch/s':>14}"
+          f"{'loop/s':>12}{'loop est. s':>14}")
+    for size in args.sizes:
+        land, applicants = make_portfolio(size, rng)
+        job = bench_rescore(land, applicants)
+
+        start = time.perf_counter()
+        credit_scoring.score_batch(applicants, land)
+        batch = time.perf_counter() - start
+
+        sample = applicants[: args.sample]
+        start = time.perf_counter()
+        for aadhaar in sample:
+            credit_scoring.calculate_credit_score(aadhaar, land)
+        loop_rate = len(sample) / (time.perf_counter() - start)
+
+        print(f"{size:>12,}{job:>10.2f}{size / job:>12,.0f}{batch:>10.3f}{size / batch:>14,.0f}"
+              f"{loop_rate:>12,.0f}{size / loop_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
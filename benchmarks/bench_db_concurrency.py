@@ -0,0 +1,106 @@
+"""Concurrency benchmark for the db connection pool.
+
+Drives N simulated Streamlit sessions, each on its own thread, against a
+scratch database.  Every session performs a read-heavy mix that mirrors the
+app: a contributor directory page and the first page of the review queue on
+most reruns, a loan submission or decision on the rest.  Reports p50/p99
+latency per operation and overall throughput.
+
+    python benchmarks/bench_db_concurrency.py --sessions 32 --ops 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import migrations  # noqa: E402
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed(contributors, loans):
+    for i in range(contributors):
+        db.register_contributor(round(random.uniform(4, 14), 1), full_name=f"Contributor {i}",
+                                email=f"c{i}@example.org", phone="9000000000", interests="Paddy",
+                                agreement="True", role="Contributor", username=f"contrib{i}",
+                                password="x")
+    for i in range(loans):
+        db.insert_loan(f"farmer{i % 50}", "Seeds", random.uniform(1000, 100000))
+
+
+def run_session(ops, write_ratio, timings, lock):
+    local = {"read_contributors": [], "read_pending": [], "write_loan": [], "write_status": []}
+    for _ in range(ops):
+        roll = random.random()
+        start = time.perf_counter()
+        if roll < write_ratio / 2:
+            db.insert_loan("farmer0", "Fertiliser", 5000.0)
+            kind = "write_loan"
+        elif roll < write_ratio:
+            db.decide_loans([(random.randint(1, 500), random.choice(["Approved", "Rejected"]))], "bench")
+            kind = "write_status"
+        elif roll < (1 + write_ratio) / 2:
+            db.search_contributors()  # the first page, as the contributor directory loads it
+            kind = "read_contributors"
+        else:
+            db.pending_loans_page()  # the first page of the Verification queue
+            kind = "read_pending"
+        local[kind].append(time.perf_counter() - start)
+    with lock:
+        for kind, samples in local.items():
+            timings.setdefault(kind, []).extend(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent simulated sessions")
+    parser.add_argument("--ops", type=int, default=200, help="operations per session")
+    parser.add_argument("--pool-size", type=int, default=db.POOL_SIZE)
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="fraction of operations that write")
+    parser.add_argument("--contributors", type=int, default=200)
+    parser.add_argument("--loans", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "bench.db"), args.pool_size)
+        migrations.migrate()
+        seed(args.contributors, args.loans)
+
+        timings, lock = {}, threading.Lock()
+        threads = [threading.Thread(target=run_session, args=(args.ops, args.write_ratio, timings, lock))
+                   for _ in range(args.sessions)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        db.get_pool().close()
+
+    total = sum(len(samples) for samples in timings.values())
+    print(f"{args.sessions} sessions x {args.ops} ops, pool size {args.pool_size}: "
+          f"{total} ops in {elapsed:.2f}s ({total / elapsed:,.0f} ops/s)")
+    print(f"{'operation':<20}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for kind in sorted(timings):
+        samples = timings[kind]
+        if not samples:
+            continue
+        print(f"{kind:<20}{len(samples):>8}{statistics.mean(samples) * 1000:>10.2f}"
+              f"{percentile(samples, 50) * 1000:>10.2f}{percentile(samples, 99) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""End-to-end load test of the app's main flows on seeded synthetic data.
+
+Two suites run against one scratch database, with outgoing mail going to a
+local SMTP stub:
+
+* ``db`` calls the functions behind each page directly: register farmers
+  and contributors, log them in, submit loan applications (scoring and
+  contributor matching included), have an admin review the queue in batches,
+  and send feedback.
+* ``app`` drives the pages headlessly with Streamlit's ``AppTest``: farmers
+  log in, open the loan form, apply and send feedback, then an admin applies
+  the risk-triaged decisions on the Verification page.  Only the script runs
+  themselves are timed, not AppTest's polling.
+
+It reports throughput and latency percentiles per operation, how long the
+outbox took to drain to the stub, and the size of the database.  Save a run
+with ``--save`` and check later runs against it with ``--baseline``; the exit
+status is 1 when any operation's p95 regressed by more than ``--tolerance``:
+
+    python benchmarks/bench_flows.py --save baseline.json
+    python benchmarks/bench_flows.py --baseline baseline.json --tolerance 0.25
+
+Registration and login run the real scrypt hash, so they dominate the ``db``
+suite; set ``HARVESTPAY_SCRYPT_N`` to change its cost.
+"""
+import argparse
+import collections
+import io
+import json
+import logging
+import os
+import random
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import auth  # noqa: E402
+import credit_scoring  # noqa: E402
+import db  # noqa: E402
+import documents  # noqa: E402
+import loan_math  # noqa: E402
+import matching  # noqa: E402
+import migrations  # noqa: E402
+import notifications  # noqa: E402
+
+
+REVIEW_BATCH = 25
+DRAIN_TIMEOUT = 120.0  # seconds to wait for the outbox to empty
+INTERESTS = ["Paddy", "Wheat", "Cotton", "Sugarcane", "Dairy", "Horticulture"]
+PURPOSES = ["Seeds", "Fertiliser", "Irrigation pump", "Tractor hire", "Storage", "Livestock"]
+
+
+# ------------------------------
+# SMTP STUB
+# ------------------------------
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Accepts every command and swallows message bodies; enough for smtplib's send_message."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 bench SMTP stub")
+        for line in self.rfile:
+            command = line.decode("ascii", "replace").strip().upper()
+            if command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for data in self.rfile:
+                    if data.rstrip(b"\r\n") == b".":
+                        break
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.received = 0
+        threading.Thread(target=self.serve_forever, name="smtp-stub", daemon=True).start()
+
+
+# ------------------------------
+# MEASUREMENT
+# ------------------------------
+
+class Timings:
+    """Per-operation latency samples (ms) and the wall time each operation took in total."""
+
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+        self.wall = collections.defaultdict(float)
+
+    def time(self, op, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.add(op, (time.perf_counter() - start) * 1000)
+        return result
+
+    def add(self, op, ms):
+        self.samples[op].append(ms)
+        self.wall[op] += ms / 1000
+
+    def summary(self):
+        """Returns {op: {count, per_s, p50, p95, p99}} with latencies in ms."""
+        result = {}
+        for op, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[op] = {"count": len(ordered),
+                          "per_s": len(ordered) / self.wall[op] if self.wall[op] else 0.0,
+                          **{f"p{pct}": ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+                             for pct in (50, 95, 99)}}
+        return result
+
+
+# ------------------------------
+# DB SUITE
+# ------------------------------
+
+def synthetic_document(rng, size=4096):
+    return io.BytesIO(rng.randbytes(size))
+
+
+def register_farmers(timings, rng, count):
+    def register(i):
+        db.insert_user(full_name=f"Farmer {i}", email=f"farmer{i}@example.org", phone=f"9{i:09d}",
+                       age=rng.randint(18, 70), gender=rng.choice(["Male", "Female", "Other"]),
+                       address=f"Village {i % 97}", land_proof=documents.store(synthetic_document(rng),
+                                                                               f"land{i}.pdf", "application/pdf"),
+                       bank_details=f"ACC{i:08d}", farming_type=rng.choice(INTERESTS),
+                       credit_history="None", role="Farmer", username=f"farmer{i}",
+                       password=auth.hash_password("farmer-pw"))
+        auth.mark_username_taken(f"farmer{i}")
+
+    for i in range(count):
+        timings.time("register_farmer", register, i)
+
+
+def register_contributors(timings, rng, count):
+    def register(i):
+        db.register_contributor(round(rng.uniform(4, 14), 1), round(rng.uniform(2, 20)) * 50_000,
+                                full_name=f"Contributor {i}", email=f"contrib{i}@example.org", phone=f"8{i:09d}",
+                                verification_doc=documents.store(synthetic_document(rng), f"kyc{i}.pdf",
+                                                                 "application/pdf"),
+                                interests=rng.choice(INTERESTS), agreement="True", role="Contributor",
+                                username=f"contrib{i}", password=auth.hash_password("contrib-pw"))
+        auth.mark_username_taken(f"contrib{i}")
+
+    for i in range(count):
+        timings.time("register_contributor", register, i)
+
+
+def login_farmers(timings, count):
+    failed = 0
+    for i in range(count):
+        user, _ = timings.time("login", auth.login, f"farmer{i}", "farmer-pw", f"bench-client{i}")
+        failed += user is None
+    if failed:
+        print(f"warning: {failed} farmer login(s) failed")
+
+
+def submit_loans(timings, rng, farmers, contributors, count):
+    def submit(applicant):
+        amount = round(rng.uniform(5_000, 200_000), -2)
+        income = round(rng.uniform(50_000, 600_000), -3)
+        existing = rng.choice([0.0, 0.0, round(rng.uniform(0, 100_000), -3)])
+        collateral = rng.choice(["", "Tractor", "Gold"])
+        months = loan_math.REPAYMENT_MONTHS[rng.choice(list(loan_math.REPAYMENT_MONTHS))]
+        credit_score, risk = credit_scoring.assess_application(amount, income, existing, collateral, months,
+                                                               credit_scoring.land_score(applicant))
+        loan_id = db.insert_loan(applicant, rng.choice(PURPOSES), amount, "Pending", annual_income=income,
+                                 existing_loans=existing, collateral=collateral or None, repayment_months=months,
+                                 credit_score=credit_score, risk=risk,
+                                 contributor=f"contrib{rng.randrange(contributors)}" if contributors else None)
+        matching.match_loan(loan_id)
+
+    for _ in range(count):
+        timings.time("submit_loan", submit, f"farmer{rng.randrange(farmers)}")
+
+
+def review_loans(timings):
+    def decide(page):
+        decisions = [(loan.id, "Rejected" if loan.risk == "High" else "Approved") for loan in page]
+        db.decide_loans(decisions, "bench-admin", notify=notifications.queue_loan_decisions)
+
+    while True:
+        page = timings.time("review_page", db.pending_loans_page, None, REVIEW_BATCH)
+        if not page:
+            break
+        timings.time("decide_batch", decide, page)
+
+
+def send_feedback(timings, rng, count):
+    for i in range(count):
+        timings.time("queue_feedback", notifications.queue_feedback,
+                     f"Feedback {i}: " + " ".join(rng.choices(PURPOSES, k=20)))
+
+
+def run_db_suite(timings, rng, args):
+    register_farmers(timings, rng, args.farmers)
+    register_contributors(timings, rng, args.contributors)
+    login_farmers(timings, args.farmers)
+    submit_loans(timings, rng, args.farmers, args.contributors, args.loans)
+    review_loans(timings)
+    send_feedback(timings, rng, args.feedback)
+
+
+# ------------------------------
+# APP SUITE
+# ------------------------------
+
+# Runs app.py the way Streamlit does (compiled once, executed in the script's
+# globals) and records how long each script run takes.
+TIMER_MODULE = """\
+import time
+APP = {app!r}
+code = None
+samples = []
+def run(script_globals):
+    global code
+    start = time.perf_counter()
+    if code is None:
+        with open(APP, encoding="utf-8") as f:
+            code = compile(f.read(), APP, "exec")
+    exec(code, script_globals)
+    samples.append((time.perf_counter() - start) * 1000)
+"""
+
+
+def widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+class AppDriver:
+    """Drives one AppTest session and records the script time of each action."""
+
+    def __init__(self, script, timer, timings):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(script, default_timeout=120)
+        self.timer = timer
+        self.timings = timings
+        self.act(None, self.at.run)
+
+    def act(self, op, action):
+        before = len(self.timer.samples)
+        action()
+        if self.at.exception:
+            raise RuntimeError(f"{op}: {self.at.exception[0].message}")
+        if op:  # an action may rerun the script more than once (st.rerun)
+            self.timings.add(op, sum(self.timer.samples[before:]))
+
+    def goto(self, page, op=None):
+        self.act(op, lambda: self.at.sidebar.radio[0].set_value(page).run())
+
+    def click(self, label, op):
+        self.act(op, lambda: widget(self.at.button, label).click().run())
+
+
+def farmer_session(script, timer, timings, rng, username):
+    app = AppDriver(script, timer, timings)
+    app.goto("Login")
+    widget(app.at.text_input, "Username").set_value(username)
+    widget(app.at.text_input, "Password").set_value("farmer-pw")
+    app.click("Login", "app_login")
+    if not app.at.success:
+        raise RuntimeError(f"app login failed for {username}: {[e.value for e in app.at.error]}")
+
+    app.goto("Loan Application", "app_loan_page")
+    widget(app.at.text_input, "Purpose of Loan").set_value(rng.choice(PURPOSES))
+    next(w for w in app.at.number_input if w.label == "Loan Amount (₹)" and w.key != "calculator_amount") \
+        .set_value(round(rng.uniform(5_000, 200_000), -2))
+    widget(app.at.number_input, "Annual Income (₹)").set_value(round(rng.uniform(50_000, 600_000), -3))
+    app.click("Submit Loan Application", "app_submit_loan")
+
+    app.goto("Feedback System", "app_feedback_page")
+    widget(app.at.text_area, "Enter your feedback or suggestions:").set_value(
+        "Feedback: " + " ".join(rng.choices(PURPOSES, k=20)))
+    app.click("Submit Feedback", "app_submit_feedback")
+
+
+def admin_session(script, timer, timings, rounds):
+    app = AppDriver(script, timer, timings)
+    app.goto("Login")
+    widget(app.at.text_input, "Username").set_value("bench-admin")
+    widget(app.at.text_input, "Password").set_value("admin-pw")
+    app.click("Login", "app_login")
+    app.goto("Verification", "app_verification_page")
+    app.act("app_verification_triage", lambda: app.at.checkbox(key="queue_auto_triage").check().run())
+    for _ in range(rounds):
+        apply = next((b for b in app.at.button if b.label.startswith("Apply ")), None)
+        if apply is None or apply.disabled:
+            break
+        app.act("app_apply_decisions", lambda: apply.click().run())
+
+
+def run_app_suite(timings, rng, args, tmp):
+    if not db.username_exists("bench-admin"):
+        db.insert_user(full_name="Bench Admin", email="admin@example.org", phone="7000000000",
+                       org_role="Reviewer", role="Admin", username="bench-admin",
+                       password=auth.hash_password("admin-pw"))
+    if not db.username_exists("farmer0"):
+        register_farmers(timings, rng, min(args.farmers, args.sessions))
+        register_contributors(timings, rng, args.contributors)
+
+    sys.path.insert(0, tmp)
+    with open(os.path.join(tmp, "_bench_timer.py"), "w") as f:
+        f.write(TIMER_MODULE.format(app=os.path.join(ROOT, "app.py")))
+    script = os.path.join(tmp, "_bench_app.py")
+    with open(script, "w") as f:
+        f.write("import _bench_timer\n_bench_timer.run(globals())\n")
+    import _bench_timer
+
+    farmers = min(args.farmers, args.sessions)
+    for i in range(args.sessions):
+        farmer_session(script, _bench_timer, timings, rng, f"farmer{i % farmers}")
+    admin_session(script, _bench_timer, timings, args.sessions)
+
+
+# ------------------------------
+# REPORT
+# ------------------------------
+
+def drain_outbox(stub):
+    """Waits for the outbox to empty and returns (seconds, messages received by the stub)."""
+    start = time.perf_counter()
+    while notifications.metrics()["queue_depth"] and time.perf_counter() - start < DRAIN_TIMEOUT:
+        time.sleep(0.05)
+    return time.perf_counter() - start, stub.received
+
+
+def database_size(path):
+    with db.connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("users", "loan_history", "loan_allocations", "outbox")}
+    size = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+    documents_size = sum(os.path.getsize(os.path.join(root, name))
+                         for root, _, names in os.walk(documents.DOCUMENT_DIR) for name in names)
+    return size, documents_size, counts
+
+
+def report(summary):
+    print(f"{'operation':<26}{'count':>7}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for op, stats in summary.items():
+        print(f"{op:<26}{stats['count']:>7}{stats['per_s']:>9.1f}"
+              f"{stats['p50']:>9.2f}{stats['p95']:>9.2f}{stats['p99']:>9.2f}")
+
+
+def regressions(summary, baseline, tolerance):
+    """Returns the operations whose p95 is more than ``tolerance`` above the baseline's."""
+    return [(op, baseline[op]["p95"], stats["p95"]) for op, stats in summary.items()
+            if op in baseline and stats["p95"] > baseline[op]["p95"] * (1 + tolerance)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", choices=["db", "app", "all"], default="all")
+    parser.add_argument("--farmers", type=int, default=100)
+    parser.add_argument("--contributors", type=int, default=20)
+    parser.add_argument("--loans", type=int, default=1000)
+    parser.add_argument("--feedback", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=20, help="farmer sessions driven through AppTest")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 increase over the baseline")
+    args = parser.parse_args()
+
+    logging.getLogger("harvestpay.slow_query").setLevel(logging.ERROR)
+    rng = random.Random(args.seed)
+    timings = Timings()
+    stub = SMTPStub()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db.configure(path)
+        documents.DOCUMENT_DIR = os.path.join(tmp, "documents")
+        migrations.migrate()
+        notifications.SENDER_EMAIL = notifications.SENDER_EMAIL or "bench@example.org"
+        notifications.RECEIVER_EMAIL = notifications.RECEIVER_EMAIL or "admin@example.org"
+        worker = notifications.start_worker(session=notifications.SMTPSession(
+            "127.0.0.1", stub.server_address[1], password=None, starttls=False), poll_interval=0.5)
+
+        start = time.perf_counter()
+        if args.suite in ("db", "all"):
+            run_db_suite(timings, rng, args)
+        if args.suite in ("app", "all"):
+            run_app_suite(timings, rng, args, tmp)
+        elapsed = time.perf_counter() - start
+        drain_seconds, received = drain_outbox(stub)
+        worker.stop(5)
+        db_size, documents_size, counts = database_size(path)
+        db.get_pool().close()
+
+    summary = timings.summary()
+    report(summary)
+    print(f"\nran in {elapsed:.1f} s; outbox drained {drain_seconds:.1f} s later, "
+          f"{received} message(s) received by the SMTP stub")
+    print(f"database {db_size / 1024 / 1024:.2f} MiB ({', '.join(f'{n} {t}' for t, n in counts.items())}), "
+          f"documents {documents_size / 1024 / 1024:.2f} MiB")
+
+    results = {"operations": summary, "db_bytes": db_size, "documents_bytes": documents_size, "rows": counts,
+               "outbox_drain_seconds": drain_seconds, "emails_received": received}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(summary, json.load(f)["operations"], args.tolerance)
+        for op, before, after in slower:
+            print(f"REGRESSION {op}: p95 {before:.2f} ms -> {after:.2f} ms")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Login latency benchmark for the scrypt cost parameters.
+
+For each scrypt ``n`` it times a full ``auth.authenticate`` against a scratch
+database (one indexed lookup plus one scrypt verification), and compares it
+with the legacy SHA-256 check and with validating a session token, which is
+what every later rerun pays instead.
+
+    python benchmarks/bench_login.py --costs 12 13 14 15 --rounds 20
+"""
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth  # noqa: E402
+import db  # noqa: E402
+import migrations  # noqa: E402
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(0.99 * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--costs", type=int, nargs="+", default=[12, 13, 14, 15],
+                        help="log2 of the scrypt n parameter to try")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "bench.db"))
+        migrations.migrate()
+        db.insert_user(full_name="Bench", phone="0", role="Farmer", username="bench", password="")
+
+        print(f"{'method':<28}{'p50 ms':>10}{'p99 ms':>10}")
+        legacy = hashlib.sha256(b"correct horse").hexdigest()
+        p50, p99 = timed(lambda: auth.verify_password("correct horse", legacy), args.rounds)
+        print(f"{'legacy sha256 verify':<28}{p50:>10.3f}{p99:>10.3f}")
+
+        default_n = auth.SCRYPT_N
+        for cost in args.costs:
+            n = 2 ** cost
+            stored = auth.hash_password("correct horse", n=n)
+            with db.transaction() as conn:
+                conn.execute("UPDATE users SET password = ? WHERE username = 'bench'", (stored,))
+            auth.SCRYPT_N = n  # keep authenticate from rehashing to the default cost
+            p50, p99 = timed(lambda: auth.authenticate("bench", "correct horse"), args.rounds)
+            marker = " (default)" if n == default_n else ""
+            print(f"{f'authenticate n=2^{cost}{marker}':<28}{p50:>10.3f}{p99:>10.3f}")
+
+        token = auth.issue_session_token("bench", "Farmer")
+        p50, p99 = timed(lambda: auth.validate_session_token(token), args.rounds * 50)
+        print(f"{'session token validate':<28}{p50:>10.3f}{p99:>10.3f}")
+        db.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
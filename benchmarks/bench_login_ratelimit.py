@@ -0,0 +1,115 @@
+"""Login latency for legitimate users while an attacker hammers the login.
+
+Legitimate users log in through ``auth.login`` one after another (each from
+its own client), while ``--attackers`` threads together send ``--rate``
+wrong-password attempts a second from a handful of clients, against a few
+target accounts and a stream of made-up usernames.  Attempts are paced like
+requests arriving over the network; without limits each one costs a
+password hash, so the attackers fall behind and simply run flat out.
+Measurement starts ``--warmup`` seconds into the attack, once the attempts
+each limit still allows have been spent.  The legitimate users' p50/p99 is reported for
+three runs: no attack, an attack with the rate limits disabled, and an attack
+with the configured limits (``HARVESTPAY_LOGIN_*``).
+
+    python benchmarks/bench_login_ratelimit.py --seconds 5 --attackers 4 --rate 200
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth  # noqa: E402
+import db  # noqa: E402
+import migrations  # noqa: E402
+import ratelimit  # noqa: E402
+
+
+USERS = 100
+ATTACKER_CLIENTS = 3
+TARGETS = 5
+CONFIGURED = ((ratelimit.login_failures.limit, ratelimit.login_failures.window),
+              (ratelimit.login_by_client.limit, ratelimit.login_by_client.window))
+
+
+def set_limits(enabled):
+    """Installs fresh limiters with the configured limits, or with limits no attack reaches."""
+    failures, by_client = CONFIGURED if enabled else ((10 ** 9, 1), (10 ** 9, 1))
+    ratelimit.login_failures = ratelimit.SlidingWindowLimiter(*failures)
+    ratelimit.login_by_client = ratelimit.SlidingWindowLimiter(*by_client)
+
+
+def attack(index, interval, stop, counts):
+    attempts = refused = 0
+    start = time.perf_counter()
+    for n in itertools.count():
+        delay = start + n * interval - time.perf_counter()
+        if stop.wait(delay) if delay > 0 else stop.is_set():
+            break
+        # Alternate between guessing a target's password and stuffing unknown usernames
+        username = f"target{n % TARGETS}" if n % 2 else f"guess-{index}-{n}"
+        _, retry_after = auth.login(username, f"wrong{n}", f"attacker{n % ATTACKER_CLIENTS}")
+        attempts += 1
+        refused += retry_after > 0
+    counts.append((attempts, refused))
+
+
+def scenario(label, seconds, warmup, attackers, rate, limits):
+    set_limits(limits)
+    stop, counts = threading.Event(), []
+    threads = [threading.Thread(target=attack, args=(i, attackers / rate, stop, counts)) for i in range(attackers)]
+    for thread in threads:
+        thread.start()
+    if attackers:
+        time.sleep(warmup)
+    samples, failed = [], 0
+    deadline = time.perf_counter() + seconds
+    for n in itertools.count():
+        if time.perf_counter() >= deadline:
+            break
+        start = time.perf_counter()
+        user, _ = auth.login(f"user{n % USERS}", "correct horse", f"client{n % USERS}")
+        samples.append((time.perf_counter() - start) * 1000)
+        failed += user is None
+    stop.set()
+    for thread in threads:
+        thread.join()
+    samples.sort()
+    attempts = sum(a for a, _ in counts) / (seconds + warmup) if attackers else 0
+    refused = sum(r for _, r in counts)
+    print(f"{label:<22}{len(samples):>8}{failed:>8}{samples[len(samples) // 2]:>10.1f}"
+          f"{samples[min(len(samples) - 1, int(0.99 * len(samples)))]:>10.1f}"
+          f"{attempts:>12.0f}{refused:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--warmup", type=float, default=5.0, help="attack time before measuring")
+    parser.add_argument("--attackers", type=int, default=4, help="attacking threads")
+    parser.add_argument("--rate", type=float, default=200.0, help="attack attempts per second, in total")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "bench.db"))
+        migrations.migrate()
+        stored = auth.hash_password("correct horse")  # one hash shared by every seeded account
+        with db.transaction() as conn:
+            conn.executemany("INSERT INTO users (full_name, phone, role, username, password) "
+                             "VALUES ('Bench', '0', 'Farmer', ?, ?)",
+                             [(f"user{i}", stored) for i in range(USERS)]
+                             + [(f"target{i}", stored) for i in range(TARGETS)])
+
+        print(f"{'run':<22}{'logins':>8}{'failed':>8}{'p50 ms':>10}{'p99 ms':>10}{'attack/s':>12}{'refused':>10}")
+        scenario("no attack", args.seconds, args.warmup, 0, args.rate, limits=True)
+        scenario("attack, no limits", args.seconds, args.warmup, args.attackers, args.rate, limits=False)
+        scenario("attack, rate limited", args.seconds, args.warmup, args.attackers, args.rate, limits=True)
+        db.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
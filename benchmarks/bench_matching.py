@@ -0,0 +1,77 @@
+"""Benchmark for matching the pending loan queue against contributor capital.
+
+For each (loans, contributors) size it seeds a scratch database and times
+``matching.match_pending`` end to end (one read of the book and the queue,
+one transaction of allocation inserts), plus the in-memory ``OrderBook``
+fills on their own.
+
+    python benchmarks/bench_matching.py --sizes 1000 5000 20000 --contributors 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import matching  # noqa: E402
+import migrations  # noqa: E402
+
+
+def make_offers(count, rng):
+    return [(f"contributor{i}", round(rng.uniform(4, 14), 1), rng.choice([None, rng.randrange(50_000, 500_000, 5_000)]))
+            for i in range(count)]
+
+
+def make_loans(count, offers, rng):
+    # Half the farmers pick a contributor, the rest leave it to the matcher
+    return [(rng.randrange(5_000, 200_000, 500), rng.choice(offers)[0] if rng.random() < 0.5 else None)
+            for _ in range(count)]
+
+
+def bench_book(offers, loans):
+    start = time.perf_counter()
+    book = matching.OrderBook(offers)
+    matched = sum(book.fill(amount, contributor) is not None for amount, contributor in loans)
+    return time.perf_counter() - start, matched
+
+
+def bench_db(offers, loans):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, "bench.db"))
+        migrations.migrate()
+        with db.transaction() as conn:
+            conn.executemany("INSERT INTO contributor_rates (contributor_username, preferred_rate, capacity) "
+                             "VALUES (?, ?, ?)", offers)
+            conn.executemany("INSERT INTO loan_history (aadhaar, name, amount, status, contributor) "
+                             "VALUES ('farmer', 'Seeds', ?, 'Pending', ?)", loans)
+        start = time.perf_counter()
+        matched, _ = matching.match_pending()
+        elapsed = time.perf_counter() - start
+        db.get_pool().close()
+    return elapsed, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000], help="pending loans")
+    parser.add_argument("--contributors", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    offers = make_offers(args.contributors, rng)
+    print(f"{'loans':>8}{'contributors':>14}{'matched':>10}{'book ms':>10}{'match_pending ms':>18}")
+    for size in args.sizes:
+        loans = make_loans(size, offers, rng)
+        book_seconds, matched = bench_book(offers, loans)
+        db_seconds, db_matched = bench_db(offers, loans)
+        assert matched == db_matched
+        print(f"{size:>8}{args.contributors:>14}{matched:>10}{book_seconds * 1000:>10.1f}{db_seconds * 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
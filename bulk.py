@@ -0,0 +1,398 @@
+"""Bulk import of farmers, contributors, historical loans and land records, and streaming loan export.
+
+Files are read in chunks (CSV through the csv module, Parquet one record
+batch at a time through pyarrow), each chunk is validated row by row and
+the valid rows are inserted with ``executemany`` in one transaction per
+chunk.  Invalid rows are skipped and reported with their row number, so one
+bad line never sinks the rest of the file.
+
+    python bulk.py import farmers farmers.csv
+    python bulk.py export loans.parquet
+"""
+import argparse
+import concurrent.futures
+import csv
+import datetime
+import io
+import json
+import os
+
+import auth
+import db
+import migrations
+
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+HASH_WORKERS = os.cpu_count() or 1  # hashlib.scrypt releases the GIL while it works
+LOAN_STATUSES = ("Pending", "Approved", "Rejected")
+RISK_LEVELS = ("Low", "Moderate", "High")
+
+
+# ------------------------------
+# FIELD CONVERTERS
+# ------------------------------
+# Each takes a raw cell (a string from CSV, a typed value from Parquet, or
+# None) and returns the stored value, or None when the cell is empty.
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _number(value):
+    value = _text(value)
+    return None if value is None else float(value)
+
+
+def _whole(value):
+    value = _number(value)
+    if value is not None and not value.is_integer():
+        raise ValueError("not a whole number")
+    return None if value is None else int(value)
+
+
+def _timestamp(value):
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    value = _text(value)
+    return None if value is None else datetime.datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _choice(options):
+    def convert(value):
+        value = _text(value)
+        if value is not None and value not in options:
+            raise ValueError(f"must be one of {', '.join(options)}")
+        return value
+    return convert
+
+
+def _at_least(convert, minimum):
+    def checked(value):
+        value = convert(value)
+        if value is not None and value < minimum:
+            raise ValueError(f"must be at least {minimum:g}")
+        return value
+    return checked
+
+
+# column: (converter, required)
+USER_FIELDS = {
+    "full_name": (_text, True),
+    "phone": (_text, True),
+    "username": (_text, True),
+    "email": (_text, False),
+    "age": (_at_least(_whole, 0), False),
+    "gender": (_text, False),
+    "address": (_text, False),
+    "farming_type": (_text, False),
+    "interests": (_text, False),
+}
+CONTRIBUTOR_FIELDS = {
+    **USER_FIELDS,
+    "preferred_rate": (_at_least(_number, 0), True),
+    "capacity": (_at_least(_number, 0), False),
+}
+LOAN_FIELDS = {
+    "aadhaar": (_text, True),
+    "name": (_text, True),
+    "amount": (_at_least(_number, 0), True),
+    "status": (_choice(LOAN_STATUSES), False),
+    "Date": (_timestamp, False),
+    "annual_income": (_at_least(_number, 0), False),
+    "existing_loans": (_at_least(_number, 0), False),
+    "collateral": (_text, False),
+    "repayment_months": (_at_least(_whole, 1), False),
+    "credit_score": (_number, False),
+    "risk": (_choice(RISK_LEVELS), False),
+    "contributor": (_text, False),
+}
+LAND_FIELDS = {
+    "aadhaar": (_text, True),
+    "land_size": (_at_least(_number, 0), True),
+    "crop_type": (_text, False),
+}
+USER_KINDS = ("farmers", "contributors")
+
+
+def validate_rows(rows, fields, first_row=1):
+    """Converts raw rows to tuples in ``fields`` order.
+
+    Returns ``(valid, errors)``: ``valid`` holds (row_number, values, raw row)
+    and ``errors`` holds (row_number, message).
+    """
+    converters = [(name, convert) for name, (convert, _) in fields.items()]
+    required = [i for i, (_, is_required) in enumerate(fields.values()) if is_required]
+    valid, errors = [], []
+    for row_number, raw in enumerate(rows, start=first_row):
+        get = raw.get
+        try:
+            values = tuple([convert(get(name)) for name, convert in converters])
+        except ValueError:
+            values = None
+        if values is None or any(values[i] is None for i in required):
+            errors.append((row_number, row_error(raw, fields)))
+        else:
+            valid.append((row_number, values, raw))
+    return valid, errors
+
+
+def row_error(raw, fields):
+    """Describes the first problem with a row that failed validation."""
+    for name, (convert, required) in fields.items():
+        cell = raw.get(name)
+        try:
+            value = convert(cell)
+        except ValueError as e:
+            return f"{name}: invalid value {cell!r} ({e})"
+        if value is None and required:
+            return f"{name} is required"
+    return "invalid row"
+
+
+# ------------------------------
+# READERS
+# ------------------------------
+
+def file_format(filename):
+    return "parquet" if filename.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def read_chunks(source, fmt="csv", chunk_size=CHUNK_SIZE):
+    """Yields the file's column names, then lists of up to ``chunk_size`` row dicts.
+
+    ``source`` is a path or a binary file-like object.  Columns come first so
+    callers can reject a file before reading its rows.
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq  # installed with Streamlit; only needed for Parquet files
+
+        parquet = pq.ParquetFile(source)
+        yield parquet.schema_arrow.names
+        for batch in parquet.iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    opened = open(source, "rb") if isinstance(source, (str, os.PathLike)) else None
+    text = io.TextIOWrapper(opened or source, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        yield reader.fieldnames or []
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        text.detach()  # leave the caller's file open
+        if opened:
+            opened.close()
+
+
+# ------------------------------
+# IMPORTERS
+# ------------------------------
+
+def _password_hashes(valid):
+    """Returns the stored hash for each row: a supplied scrypt ``password_hash``, or a fresh hash of ``password``."""
+    def stored(raw):
+        supplied = _text(raw.get("password_hash"))
+        return supplied if supplied else auth.hash_password(_text(raw.get("password")))
+
+    with concurrent.futures.ThreadPoolExecutor(HASH_WORKERS) as pool:
+        return list(pool.map(stored, (raw for _, _, raw in valid)))
+
+
+def _check_passwords(valid, errors):
+    checked = []
+    for row_number, values, raw in valid:
+        supplied = _text(raw.get("password_hash"))
+        if supplied and not supplied.startswith("scrypt$"):
+            errors.append((row_number, "password_hash must be an scrypt hash"))
+        elif not supplied and not _text(raw.get("password")):
+            errors.append((row_number, "password or password_hash is required"))
+        else:
+            checked.append((row_number, values, raw))
+    return checked
+
+
+def _import_users(valid, errors, role, seen):
+    valid = _check_passwords(valid, errors)
+    unique = []
+    for row_number, values, raw in valid:
+        username = values[2]
+        if username in seen:
+            errors.append((row_number, f"username {username!r} appears earlier in the file"))
+        else:
+            seen.add(username)
+            unique.append((row_number, values, raw))
+    hashes = _password_hashes(unique)
+
+    user_columns = list(USER_FIELDS)
+    with db.transaction() as conn:
+        existing = {username for (username,) in conn.execute(
+            "SELECT username FROM users WHERE username IN (SELECT value FROM json_each(?))",
+            (json.dumps([values[2] for _, values, _ in unique]),))}
+        rows, rates = [], []
+        for (row_number, values, _), stored in zip(unique, hashes):
+            if values[2] in existing:
+                errors.append((row_number, f"username {values[2]!r} is already registered"))
+                continue
+            rows.append((*values[:len(user_columns)], role, stored))
+            if role == "Contributor":
+                rates.append((values[2], *values[len(user_columns):]))
+        conn.executemany(
+            f"INSERT INTO users ({', '.join(user_columns)}, role, password) "
+            f"VALUES ({', '.join('?' * (len(user_columns) + 2))})", rows)
+        conn.executemany("INSERT INTO contributor_rates (contributor_username, preferred_rate, capacity) "
+                         "VALUES (?, ?, ?)", rates)
+    return len(rows)
+
+
+def _import_loans(valid, errors, seen):
+    """Inserts a chunk of loans.
+
+    A row in ``bulk_loads`` switches the per-row summary trigger off for the
+    duration of the transaction, and the chunk is added to the summary tables
+    in one grouped upsert instead.  The row is removed before commit, so no
+    other connection ever sees it (and no schema change is involved).
+    """
+    columns = list(LOAN_FIELDS)
+    placeholders = ", ".join("COALESCE(?, 'Pending')" if name == "status" else
+                             "COALESCE(?, CURRENT_TIMESTAMP)" if name == "Date" else "?" for name in columns)
+    with db.transaction() as conn:
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM loan_history").fetchone()[0]
+        conn.execute("INSERT INTO bulk_loads (name) VALUES ('loan_history')")
+        conn.executemany(f"INSERT INTO loan_history ({', '.join(columns)}) VALUES ({placeholders})",
+                         (values for _, values, _ in valid))
+        for statement in migrations.summary_upserts():
+            conn.execute(statement, (last_id,))
+        conn.execute("DELETE FROM bulk_loads WHERE name = 'loan_history'")
+    return len(valid)
+
+
+def _import_land_records(valid, errors, seen):
+    """Inserts a chunk of land records; a record for an Aadhaar already on file replaces it."""
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO land_records (aadhaar, land_size, crop_type) VALUES (?, ?, ?) "
+                         "ON CONFLICT (aadhaar) DO UPDATE SET land_size = excluded.land_size, "
+                         "crop_type = excluded.crop_type", (values for _, values, _ in valid))
+    return len(valid)
+
+
+IMPORTS = {
+    # kind: (fields, importer)
+    "farmers": (USER_FIELDS, lambda valid, errors, seen: _import_users(valid, errors, "Farmer", seen)),
+    "contributors": (CONTRIBUTOR_FIELDS, lambda valid, errors, seen: _import_users(valid, errors, "Contributor", seen)),
+    "loans": (LOAN_FIELDS, _import_loans),
+    "land_records": (LAND_FIELDS, _import_land_records),
+}
+
+
+def import_file(kind, source, fmt="csv", chunk_size=CHUNK_SIZE, progress=None):
+    """Imports a CSV or Parquet file of ``kind`` ("farmers", "contributors", "loans" or "land_records").
+
+    Returns ``(imported, rejected, errors)`` where ``errors`` lists up to
+    MAX_REPORTED_ERRORS (row_number, message) pairs.  Row numbers count data
+    rows from 1.  Each chunk commits on its own, so rows imported before a
+    failure stay imported.  ``progress`` is called with the running counts
+    after every chunk.
+    """
+    fields, importer = IMPORTS[kind]
+    chunks = read_chunks(source, fmt, chunk_size)
+    columns = set(next(chunks))
+    missing = [name for name, (_, required) in fields.items() if required and name not in columns]
+    if kind in USER_KINDS and not {"password", "password_hash"} & columns:
+        missing.append("password")
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    imported = rejected = 0
+    reported, seen = [], set()
+    first_row = 1
+    for chunk in chunks:
+        valid, errors = validate_rows(chunk, fields, first_row)
+        imported += importer(valid, errors, seen)
+        rejected += len(errors)
+        reported.extend(sorted(errors)[:MAX_REPORTED_ERRORS - len(reported)])
+        first_row += len(chunk)
+        if progress:
+            progress(imported, rejected)
+    return imported, rejected, reported
+
+
+# ------------------------------
+# EXPORT
+# ------------------------------
+
+LOAN_EXPORT_COLUMNS = ("id", *LOAN_FIELDS, "scored_at")
+
+
+def iter_loan_rows(chunk_size=CHUNK_SIZE):
+    """Yields loan_history rows in id order, one keyset page at a time."""
+    sql = (f"SELECT {', '.join(LOAN_EXPORT_COLUMNS)} FROM loan_history WHERE id > ? ORDER BY id LIMIT ?")
+    last_id = 0
+    while True:
+        with db.connection() as conn:
+            rows = conn.execute(sql, (last_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def export_loans(path, fmt=None, chunk_size=CHUNK_SIZE):
+    """Writes the loan history to a CSV or Parquet file without loading the whole table; returns the row count."""
+    fmt = fmt or file_format(path)
+    count = 0
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([("id", pa.int64()), ("aadhaar", pa.string()), ("name", pa.string()),
+                            ("amount", pa.float64()), ("status", pa.string()), ("Date", pa.string()),
+                            ("annual_income", pa.float64()), ("existing_loans", pa.float64()),
+                            ("collateral", pa.string()), ("repayment_months", pa.int64()),
+                            ("credit_score", pa.float64()), ("risk", pa.string()), ("contributor", pa.string()),
+                            ("scored_at", pa.string())])
+        with pq.ParquetWriter(path, schema) as writer:
+            for rows in iter_loan_rows(chunk_size):
+                writer.write_table(pa.Table.from_pylist([dict(zip(LOAN_EXPORT_COLUMNS, row)) for row in rows],
+                                                        schema=schema))
+                count += len(rows)
+        return count
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(LOAN_EXPORT_COLUMNS)
+        for rows in iter_loan_rows(chunk_size):
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import and export for the loan database.")
+    parser.add_argument("--db", default=db.DB_PATH, help="database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="import farmers, contributors, loans or land records")
+    import_parser.add_argument("kind", choices=list(IMPORTS))
+    import_parser.add_argument("file")
+    export_parser = commands.add_parser("export", help="export the loan history")
+    export_parser.add_argument("file", help="output .csv or .parquet file")
+    args = parser.parse_args()
+    db.configure(args.db)
+    migrations.migrate()
+    if args.command == "import":
+        imported, rejected, errors = import_file(args.kind, args.file, file_format(args.file))
+        for row_number, message in errors:
+            print(f"row {row_number}: {message}")
+        print(f"Imported {imported} row(s); rejected {rejected}.")
+    else:
+        print(f"Exported {export_loans(args.file)} loan(s).")
@@ -0,0 +1,143 @@
+"""Credit card issuance and activation.
+
+Cards are issued in bulk, one per approved loan, with a limit derived from
+the loan amount and its risk band.  Each card starts "Inactive" with a
+one-time activation code, of which only a salted scrypt hash is stored; the
+hash is compared in constant time, cleared once the card is active, and the
+card is locked for a while after repeated wrong codes.
+"""
+import hashlib
+import hmac
+import secrets
+import time
+
+import db
+
+
+CARD_LIMIT_RATIOS = {"Low": 0.5, "Moderate": 0.3, "High": 0.1}
+DEFAULT_LIMIT_RATIO = 0.2  # loans that were never scored
+MIN_LIMIT = 5000.0
+LIMIT_STEP = 500
+CODE_DIGITS = 6
+MAX_ATTEMPTS = 5
+LOCKOUT_SECONDS = 15 * 60
+# Cheap enough to hash every card issued in one transaction, while making a
+# search of all 10**CODE_DIGITS codes against a leaked hash take minutes per card
+CODE_SCRYPT_N, CODE_SCRYPT_R, CODE_SCRYPT_P = 2 ** 10, 8, 1
+
+
+def card_limit(amount, risk):
+    """Returns the card limit for a loan, rounded down to LIMIT_STEP and never below MIN_LIMIT."""
+    ratio = CARD_LIMIT_RATIOS.get(risk, DEFAULT_LIMIT_RATIO)
+    return max(MIN_LIMIT, (amount or 0) * ratio // LIMIT_STEP * LIMIT_STEP)
+
+
+def luhn_check_digit(digits):
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if position % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def generate_card_number():
+    """Returns a random 16-digit card number with a valid Luhn check digit, formatted in groups of four."""
+    body = str(secrets.randbelow(9) + 1) + "".join(str(secrets.randbelow(10)) for _ in range(14))
+    number = body + luhn_check_digit(body)
+    return "-".join(number[i:i + 4] for i in range(0, 16, 4))
+
+
+def normalize_card_number(card_number):
+    digits = "".join(ch for ch in card_number if ch.isdigit())
+    return "-".join(digits[i:i + 4] for i in range(0, len(digits), 4))
+
+
+def mask_card_number(card_number):
+    return "XXXX-XXXX-XXXX-" + card_number[-4:]
+
+
+def hash_code(code, salt=None):
+    """Returns the stored form of an activation code: ``salt$hash``, with a fresh salt unless one is given."""
+    salt = salt or secrets.token_hex(8)
+    digest = hashlib.scrypt(code.strip().encode(), salt=salt.encode(),
+                            n=CODE_SCRYPT_N, r=CODE_SCRYPT_R, p=CODE_SCRYPT_P, dklen=32)
+    return f"{salt}${digest.hex()}"
+
+
+def code_matches(code, stored):
+    """Checks an entered activation code against its stored hash in constant time."""
+    if not stored or "$" not in stored:
+        return False
+    salt = stored.split("$", 1)[0]
+    return hmac.compare_digest(hash_code(code, salt).encode(), stored.encode())
+
+
+def issue_cards_for_approved_loans(notify=None):
+    """Issues a card for every approved loan that has none.
+
+    Returns ``(issued, notified)``: (loan_id, aadhaar, card_number,
+    activation_code, limit_amount) for each card issued, and the loan ids
+    returned by ``notify(issued, conn)`` (an empty set without ``notify``).
+    ``notify`` runs inside the inserting transaction, so the activation codes
+    it queues commit with the cards.  The plaintext codes exist only in this
+    return value; the table keeps their hashes.
+
+    Codes are hashed before the write lock is taken, so the transaction holds
+    only the inserts.  Loans a concurrent issue got to first are skipped: the
+    UNIQUE loan_id on credit_cards means a loan never gets two cards.
+    """
+    with db.connection() as conn:
+        loans = conn.execute(
+            "SELECT l.id, l.aadhaar, l.amount, l.risk FROM loan_history l "
+            "LEFT JOIN credit_cards c ON c.loan_id = l.id "
+            "WHERE l.status = 'Approved' AND c.loan_id IS NULL").fetchall()
+    candidates = []
+    for loan_id, aadhaar, amount, risk in loans:
+        code = f"{secrets.randbelow(10 ** CODE_DIGITS):0{CODE_DIGITS}d}"
+        candidates.append(((loan_id, aadhaar, generate_card_number(), code, card_limit(amount, risk)),
+                           hash_code(code)))
+    if not candidates:
+        return [], set()
+
+    with db.transaction() as conn:
+        issued = [card for card, code_hash in candidates if conn.execute(
+            "INSERT OR IGNORE INTO credit_cards (loan_id, aadhaar, card_number, activation_code_hash, limit_amount, "
+            "status, issued_at) VALUES (?, ?, ?, ?, ?, 'Inactive', CURRENT_TIMESTAMP)",
+            (*card[:3], code_hash, card[4])).rowcount]
+        notified = notify(issued, conn) if notify and issued else set()
+    return issued, notified
+
+
+def activate_card(aadhaar, card_number, code):
+    """Activates one of the cardholder's cards; returns ``(activated, message)``."""
+    card_number = normalize_card_number(card_number)
+    now = time.time()
+    with db.transaction() as conn:
+        row = conn.execute("SELECT activation_code_hash, status, failed_attempts, locked_until FROM credit_cards "
+                           "WHERE card_number = ? AND aadhaar = ?", (card_number, aadhaar)).fetchone()
+        if row is None:
+            return False, "Card not found."
+        expected, status, failed_attempts, locked_until = row
+        if status == "Active":
+            return False, "This card is already active."
+        if locked_until and locked_until > now:
+            return False, f"Too many attempts. Try again in {int((locked_until - now) // 60) + 1} minute(s)."
+
+        if code_matches(code, expected):
+            conn.execute("UPDATE credit_cards SET status = 'Active', activated_at = CURRENT_TIMESTAMP, "
+                         "activation_code_hash = NULL, failed_attempts = 0, locked_until = NULL "
+                         "WHERE card_number = ?", (card_number,))
+            return True, "Card activated successfully!"
+
+        failed_attempts += 1
+        if failed_attempts >= MAX_ATTEMPTS:
+            conn.execute("UPDATE credit_cards SET failed_attempts = 0, locked_until = ? WHERE card_number = ?",
+                         (now + LOCKOUT_SECONDS, card_number))
+            return False, f"Too many attempts. The card is locked for {LOCKOUT_SECONDS // 60} minutes."
+        conn.execute("UPDATE credit_cards SET failed_attempts = ? WHERE card_number = ?",
+                     (failed_attempts, card_number))
+        return False, f"Invalid activation code. {MAX_ATTEMPTS - failed_attempts} attempt(s) left."
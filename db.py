@@ -0,0 +1,619 @@
+"""SQLite data access layer for the Tenant Farmer Loan Management System.
+
+Streamlit runs every rerun of every browser session on its own thread, so the
+app must never share one cursor between users.  This module keeps a small pool
+of WAL-mode connections and exposes repository functions for each table; every
+function checks a connection out for exactly one unit of work.
+"""
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import instrumentation
+
+
+DB_PATH = os.environ.get("HARVESTPAY_DB", "farmer_data.db")
+POOL_SIZE = int(os.environ.get("HARVESTPAY_DB_POOL_SIZE", "8"))
+BUSY_TIMEOUT = 5.0  # seconds a writer waits for the lock before giving up
+
+
+# ------------------------------
+# CONNECTION POOL
+# ------------------------------
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections that can be shared across threads.
+
+    Connections are opened lazily up to ``size``; once that many are checked
+    out, further callers block until one is returned, for at most ``timeout``
+    seconds before ``sqlite3.OperationalError`` is raised.  Every connection runs
+    in WAL mode so readers never wait for a writer, and in autocommit mode so
+    that transactions are always explicit (see :meth:`transaction`).
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, timeout=BUSY_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None,
+                               factory=instrumentation.connection_factory())
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except BaseException:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"no database connection free after {self.timeout:g} seconds ({self.size} in use)") from None
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Checks a connection out of the pool for the duration of the block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Runs the block in one write transaction, committing on success.
+
+        ``BEGIN IMMEDIATE`` takes the write lock up front, so concurrent
+        writers queue on ``busy_timeout`` instead of failing mid-transaction.
+        """
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        """Closes every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_PATH, POOL_SIZE)
+        return _pool
+
+
+def configure(path=DB_PATH, size=POOL_SIZE):
+    """Points the process-wide pool at another database file."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(path, size)
+        return _pool
+
+
+def connection():
+    return get_pool().connection()
+
+
+def transaction():
+    return get_pool().transaction()
+
+
+# ------------------------------
+# RECORDS
+# ------------------------------
+
+class Record:
+    """A row with named fields.
+
+    Subclasses list their columns in ``__slots__``, in SELECT order, so a
+    record costs no per-instance dict and queries name exactly the columns
+    they read (see :meth:`select_list`).
+    """
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def select_list(cls, alias=None):
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + name for name in cls.__slots__)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls(*row) for row in rows]
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class User(Record):
+    """A user's identity and profile, without the password hash or document digests."""
+    __slots__ = ("id", "username", "full_name", "role", "email", "phone", "age", "gender", "address",
+                 "farming_type", "interests", "org_role")
+
+
+class Loan(Record):
+    __slots__ = ("id", "aadhaar", "name", "amount", "status", "Date", "repayment_months", "credit_score", "risk",
+                 "contributor")
+
+
+# ------------------------------
+# USERS
+# ------------------------------
+
+USER_COLUMNS = (
+    "full_name", "email", "phone", "age", "gender", "address", "land_proof",
+    "bank_details", "farming_type", "credit_history", "verification_doc",
+    "interests", "agreement", "role", "org_role", "gov_id", "username", "password",
+)
+
+
+def _insert_user(conn, fields):
+    unknown = set(fields) - set(USER_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown user columns: {', '.join(sorted(unknown))}")
+    columns = ", ".join(fields)
+    placeholders = ", ".join("?" * len(fields))
+    cur = conn.execute(f"INSERT INTO users ({columns}) VALUES ({placeholders})",
+                       tuple(fields.values()))
+    return cur.lastrowid
+
+
+def insert_user(**fields):
+    """Inserts a user row and returns its id."""
+    with transaction() as conn:
+        return _insert_user(conn, fields)
+
+
+def register_contributor(preferred_rate, capacity=None, **fields):
+    """Inserts a contributor, their preferred rate and the capital they offer in one transaction."""
+    with transaction() as conn:
+        user_id = _insert_user(conn, fields)
+        conn.execute("INSERT INTO contributor_rates (contributor_username, preferred_rate, capacity) VALUES (?, ?, ?)",
+                     (fields["username"], preferred_rate, capacity))
+        return user_id
+
+
+def find_login(username):
+    """Returns (password_hash, User) for a username, or None."""
+    with connection() as conn:
+        row = conn.execute(f"SELECT password, {User.select_list()} FROM users WHERE username = ?",
+                           (username,)).fetchone()
+    return (row[0], User(*row[1:])) if row else None
+
+
+def username_exists(username):
+    """Returns whether a user with this username exists (an index lookup on the UNIQUE username)."""
+    with connection() as conn:
+        return conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+
+def get_user(username):
+    """Returns the User with this username, or None."""
+    with connection() as conn:
+        row = conn.execute(f"SELECT {User.select_list()} FROM users WHERE username = ?", (username,)).fetchone()
+    return User(*row) if row else None
+
+
+PROFILE_FIELDS = ("full_name", "email", "phone", "address", "farming_type", "interests")
+
+
+def update_profile(username, **fields):
+    """Updates the editable profile fields of a user."""
+    unknown = set(fields) - set(PROFILE_FIELDS)
+    if unknown:
+        raise ValueError(f"Not editable profile fields: {', '.join(sorted(unknown))}")
+    if not fields:
+        return
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with transaction() as conn:
+        conn.execute(f"UPDATE users SET {assignments} WHERE username = ?", (*fields.values(), username))
+
+
+def update_password_hash(username, old_hash, new_hash):
+    """Replaces a password hash, unless it changed since ``old_hash`` was read."""
+    with transaction() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE username = ? AND password = ?",
+                     (new_hash, username, old_hash))
+
+
+# ------------------------------
+# DOCUMENTS
+# ------------------------------
+
+def record_document(digest, size, filename, content_type):
+    """Records metadata for a stored document; a digest already on record is left unchanged."""
+    with transaction() as conn:
+        conn.execute("INSERT OR IGNORE INTO documents (digest, size, filename, content_type) VALUES (?, ?, ?, ?)",
+                     (digest, size, filename, content_type))
+
+
+USER_DOCUMENT_FIELDS = {
+    "land_proof": "Land Ownership Proof",
+    "verification_doc": "Verification Document",
+    "gov_id": "Government ID Proof",
+}
+
+
+def user_documents(username):
+    """Returns (label, digest, filename, content_type, size) for each document a user uploaded."""
+    sql = " UNION ALL ".join(
+        f"SELECT '{label}', d.digest, d.filename, d.content_type, d.size "
+        f"FROM users u JOIN documents d ON d.digest = u.{field} WHERE u.username = ?"
+        for field, label in USER_DOCUMENT_FIELDS.items())
+    with connection() as conn:
+        return conn.execute(sql, (username,) * len(USER_DOCUMENT_FIELDS)).fetchall()
+
+
+# ------------------------------
+# LOAN HISTORY
+# ------------------------------
+
+def insert_loan(aadhaar, name, amount, status="Pending", annual_income=None, existing_loans=None,
+                collateral=None, repayment_months=None, credit_score=None, risk=None, contributor=None):
+    """Records a loan application and returns its id."""
+    with transaction() as conn:
+        cur = conn.execute(
+            "INSERT INTO loan_history (aadhaar, name, amount, status, annual_income, existing_loans, collateral, "
+            "repayment_months, credit_score, risk, contributor, scored_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CASE WHEN ? IS NULL THEN NULL ELSE CURRENT_TIMESTAMP END)",
+            (aadhaar, name, amount, status, annual_income, existing_loans, collateral, repayment_months,
+             credit_score, risk, contributor, credit_score))
+        return cur.lastrowid
+
+
+def loan_history_page(aadhaar, before=None, limit=20):
+    """Returns up to ``limit`` of an applicant's loans, newest first, as Loan records.
+
+    Keyset pagination over the (aadhaar, Date) index: pass
+    :func:`history_cursor` of the last loan of one page as ``before`` to get
+    the next, so older pages cost the same as the first.
+    """
+    clauses = ["aadhaar = ?"]
+    params = [aadhaar]
+    if before is not None:
+        # Spelled out rather than as a row value so SQLite can seek the index
+        clauses.append("Date <= ? AND (Date < ? OR id < ?)")
+        params.extend((before[0], before[0], before[1]))
+    sql = (f"SELECT {Loan.select_list()} FROM loan_history WHERE {' AND '.join(clauses)} "
+           f"ORDER BY Date DESC, id DESC LIMIT ?")
+    with connection() as conn:
+        return Loan.from_rows(conn.execute(sql, (*params, limit)))
+
+
+def history_cursor(loan):
+    """Returns the keyset cursor that follows ``loan`` from :func:`loan_history_page`."""
+    return loan.Date, loan.id
+
+
+def loan_totals(aadhaar):
+    """Returns {status: (count, total amount)} over all of an applicant's loans."""
+    with connection() as conn:
+        return {status: (count, total) for status, count, total in conn.execute(
+            "SELECT status, COUNT(*), COALESCE(SUM(amount), 0) FROM loan_history WHERE aadhaar = ? GROUP BY status",
+            (aadhaar,))}
+
+
+REVIEW_ORDERS = {
+    # order name: (keyset condition, ORDER BY clause)
+    "oldest": ("id > ?", "id"),
+    # Spelled out rather than as a row value so SQLite can seek the (status, score, id) index
+    "risk": ("COALESCE(credit_score, 0) >= ? AND (COALESCE(credit_score, 0) > ? OR id > ?)",
+             "COALESCE(credit_score, 0), id"),
+}
+
+
+def review_cursor(loan, order="oldest"):
+    """Returns the keyset cursor that follows ``loan`` from :func:`pending_loans_page`."""
+    return loan.id if order == "oldest" else (loan.credit_score or 0, loan.id)
+
+
+def pending_loans_page(after=None, limit=25, applicant=None, min_amount=None, max_amount=None,
+                       since=None, until=None, order="oldest"):
+    """Returns up to ``limit`` pending loans that sort after the ``after`` cursor.
+
+    Loans are returned as Loan records.  ``order`` is "oldest" (by id) or "risk" (lowest credit score, i.e.
+    highest risk, first; unscored loans come first).  Keyset pagination:
+    pass :func:`review_cursor` of the last row of one page as ``after`` to
+    fetch the next.  Each page is an index range scan, so deep pages cost the
+    same as the first.  ``since``/``until`` are ISO dates (inclusive)
+    compared against the submission date.
+    """
+    keyset, order_by = REVIEW_ORDERS[order]
+    clauses = ["status = 'Pending'"]
+    params = []
+    if after is not None:
+        clauses.append(keyset)
+        params.extend((after,) if order == "oldest" else (after[0], after[0], after[1]))
+    if applicant:
+        clauses.append("aadhaar = ?")
+        params.append(applicant)
+    if min_amount is not None:
+        clauses.append("amount >= ?")
+        params.append(min_amount)
+    if max_amount is not None:
+        clauses.append("amount <= ?")
+        params.append(max_amount)
+    if since:
+        clauses.append("Date >= ?")
+        params.append(since)
+    if until:
+        clauses.append("Date < date(?, '+1 day')")
+        params.append(until)
+    sql = (f"SELECT {Loan.select_list()} FROM loan_history "
+           f"WHERE {' AND '.join(clauses)} ORDER BY {order_by} LIMIT ?")
+    with connection() as conn:
+        return Loan.from_rows(conn.execute(sql, (*params, limit)))
+
+
+def decide_loans(decisions, decided_by, notify=None):
+    """Applies many (loan_id, status) decisions in one transaction.
+
+    Only loans that are still pending change, so two admins reviewing the
+    same queue cannot overwrite each other; every decision that takes effect
+    is recorded in loan_decisions.  ``notify(applied, conn)`` runs inside the
+    transaction, so whatever it queues in the outbox commits (or rolls back)
+    with the decisions.  Returns the (loan_id, status) pairs that were applied.
+    """
+    decisions = dict(decisions)
+    if not decisions:
+        return []
+    placeholders = ", ".join("?" * len(decisions))
+    with transaction() as conn:
+        pending = {row[0] for row in conn.execute(
+            f"SELECT id FROM loan_history WHERE status = 'Pending' AND id IN ({placeholders})", tuple(decisions))}
+        applied = [(loan_id, status) for loan_id, status in decisions.items() if loan_id in pending]
+        conn.executemany("UPDATE loan_history SET status = ? WHERE id = ?",
+                         [(status, loan_id) for loan_id, status in applied])
+        conn.executemany("INSERT INTO loan_decisions (loan_id, status, decided_by) VALUES (?, ?, ?)",
+                         [(loan_id, status, decided_by) for loan_id, status in applied])
+        if notify and applied:
+            notify(applied, conn)
+    return applied
+
+
+def loan_contacts(loan_ids, conn=None):
+    """Returns (loan_id, email, full_name, purpose, amount) for applicants with an email on file.
+
+    Reads on ``conn`` when given, e.g. inside the caller's transaction.
+    """
+    loan_ids = list(loan_ids)
+    if not loan_ids:
+        return []
+    placeholders = ", ".join("?" * len(loan_ids))
+    with contextlib.nullcontext(conn) if conn else connection() as conn:
+        return conn.execute(
+            "SELECT l.id, u.email, u.full_name, l.name, l.amount "
+            "FROM loan_history l JOIN users u ON u.username = l.aadhaar "
+            f"WHERE l.id IN ({placeholders}) AND u.email IS NOT NULL AND u.email != ''",
+            tuple(loan_ids)).fetchall()
+
+
+def get_land_record(aadhaar):
+    """Returns (land_size, crop_type) for an applicant, or None."""
+    with connection() as conn:
+        return conn.execute("SELECT land_size, crop_type FROM land_records WHERE aadhaar = ?",
+                            (aadhaar,)).fetchone()
+
+
+def recent_decisions(limit=20):
+    """Returns the latest (loan_id, status, decided_by, decided_at) audit rows."""
+    with connection() as conn:
+        return conn.execute("SELECT loan_id, status, decided_by, decided_at FROM loan_decisions "
+                            "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+
+# ------------------------------
+# LOAN SUMMARIES
+# ------------------------------
+# Maintained by triggers on loan_history (migration 8), so reading them never
+# scans the loan table.
+
+def summary_by_status():
+    """Returns (status, loan_count, total_amount) rows."""
+    with connection() as conn:
+        return conn.execute("SELECT status, loan_count, total_amount FROM loan_summary_status "
+                            "WHERE loan_count > 0 ORDER BY status").fetchall()
+
+
+def summary_by_day(since):
+    """Returns (day, status, loan_count, total_amount) rows from ``since`` (an ISO date) onwards."""
+    with connection() as conn:
+        return conn.execute("SELECT day, status, loan_count, total_amount FROM loan_summary_daily "
+                            "WHERE day >= ? AND loan_count > 0 ORDER BY day", (since,)).fetchall()
+
+
+def summary_by_contributor(limit=20):
+    """Returns (contributor, status, loan_count, total_amount) rows for the contributors with most lending."""
+    with connection() as conn:
+        return conn.execute(
+            "SELECT contributor, status, loan_count, total_amount FROM loan_summary_contributor "
+            "WHERE contributor IN (SELECT contributor FROM loan_summary_contributor GROUP BY contributor "
+            "ORDER BY SUM(total_amount) DESC LIMIT ?) AND loan_count > 0 ORDER BY contributor",
+            (limit,)).fetchall()
+
+
+# ------------------------------
+# CONTRIBUTOR RATES
+# ------------------------------
+
+CONTRIBUTOR_SORTS = {
+    "rate": "cr.preferred_rate, u.username",
+    "username": "u.username",
+}
+
+
+def search_contributors(interest=None, max_rate=None, sort="rate", limit=20, offset=0):
+    """Returns one page of (username, interests, agreement, preferred_rate) contributor rows.
+
+    Filtering, ordering and paging all happen in SQL, so callers never pull
+    the whole contributor catalogue into memory.
+    """
+    clauses = ["u.role = 'Contributor'"]
+    params = []
+    if interest:
+        escaped = interest.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append("u.interests LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    if max_rate is not None:
+        clauses.append("cr.preferred_rate <= ?")
+        params.append(max_rate)
+    sql = ("SELECT u.username, u.interests, u.agreement, cr.preferred_rate "
+           "FROM users u JOIN contributor_rates cr ON u.username = cr.contributor_username "
+           f"WHERE {' AND '.join(clauses)} ORDER BY {CONTRIBUTOR_SORTS[sort]} LIMIT ? OFFSET ?")
+    with connection() as conn:
+        return conn.execute(sql, (*params, limit, offset)).fetchall()
+
+
+def contributor_capital(username):
+    """Returns (capacity, committed) for a contributor, or None; capacity is None when they set no limit."""
+    with connection() as conn:
+        return conn.execute("SELECT capacity, committed FROM contributor_rates WHERE contributor_username = ?",
+                            (username,)).fetchone()
+
+
+def loan_allocations(loan_ids):
+    """Returns (loan_id, contributor_username, amount, rate) for the given loans' allocations."""
+    loan_ids = list(loan_ids)
+    if not loan_ids:
+        return []
+    placeholders = ", ".join("?" * len(loan_ids))
+    with connection() as conn:
+        return conn.execute(
+            "SELECT loan_id, contributor_username, amount, rate FROM loan_allocations "
+            f"WHERE loan_id IN ({placeholders}) ORDER BY loan_id, amount DESC", loan_ids).fetchall()
+
+
+# ------------------------------
+# CREDIT CARDS
+# ------------------------------
+
+def cards_for_aadhaar(aadhaar):
+    """Returns (card_number, limit_amount, status, issued_at, activated_at) for a cardholder's cards."""
+    with connection() as conn:
+        return conn.execute("SELECT card_number, limit_amount, status, issued_at, activated_at FROM credit_cards "
+                            "WHERE aadhaar = ? ORDER BY issued_at DESC", (aadhaar,)).fetchall()
+
+
+def count_unmigrated_cards():
+    """Returns how many legacy card rows were set aside by the upgrade (no or duplicate card number)."""
+    with connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM credit_cards_unmigrated").fetchone()[0]
+
+
+def count_loans_awaiting_card():
+    """Returns how many approved loans have no card issued yet."""
+    with connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM loan_history l LEFT JOIN credit_cards c ON c.loan_id = l.id "
+                            "WHERE l.status = 'Approved' AND c.loan_id IS NULL").fetchone()[0]
+
+
+# ------------------------------
+# OUTBOX
+# ------------------------------
+
+def enqueue_messages(messages, conn=None):
+    """Stores (kind, recipient, subject, body) messages for the outbox worker.
+
+    Writes on ``conn`` when given, so the messages commit with the caller's
+    transaction; otherwise in a transaction of their own.
+    """
+    now = time.time()
+    with contextlib.nullcontext(conn) if conn else transaction() as conn:
+        conn.executemany("INSERT INTO outbox (kind, recipient, subject, body, created_at, next_attempt_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         [(kind, recipient, subject, body, now, now) for kind, recipient, subject, body in messages])
+
+
+def claim_outbox(worker_id, limit, stale_after=600):
+    """Claims up to ``limit`` due messages and returns (id, recipient, subject, body, attempts) rows.
+
+    Messages claimed by a worker that died mid-send become due again after
+    ``stale_after`` seconds.
+    """
+    now = time.time()
+    with transaction() as conn:
+        rows = conn.execute(
+            "SELECT id, recipient, subject, body, attempts FROM outbox "
+            "WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND claimed_at < ?) "
+            "ORDER BY id LIMIT ?", (now, now - stale_after, limit)).fetchall()
+        conn.executemany("UPDATE outbox SET status = 'sending', claimed_by = ?, claimed_at = ? WHERE id = ?",
+                         [(worker_id, now, row[0]) for row in rows])
+    return rows
+
+
+def complete_outbox(sent_ids, failures):
+    """Records one batch of results.
+
+    ``failures`` holds (id, attempts, error, next_attempt_at) tuples; a
+    ``next_attempt_at`` of None marks the message as permanently failed.
+    """
+    now = time.time()
+    with transaction() as conn:
+        conn.executemany("UPDATE outbox SET status = 'sent', sent_at = ?, claimed_by = NULL WHERE id = ?",
+                         [(now, message_id) for message_id in sent_ids])
+        conn.executemany(
+            "UPDATE outbox SET status = CASE WHEN ? IS NULL THEN 'failed' ELSE 'pending' END, "
+            "attempts = ?, last_error = ?, next_attempt_at = COALESCE(?, next_attempt_at), claimed_by = NULL "
+            "WHERE id = ?",
+            [(next_at, attempts, error, next_at, message_id)
+             for message_id, attempts, error, next_at in failures])
+
+
+def outbox_counts():
+    """Returns a {status: count} summary of the outbox."""
+    with connection() as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
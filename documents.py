@@ -0,0 +1,89 @@
+"""Content-addressed storage for uploaded documents.
+
+Uploads (land proof, verification documents, government IDs) are streamed to
+disk in chunks while being hashed, and stored once per distinct content under
+their SHA-256 digest.  The database keeps only the digest, plus a row of
+metadata in ``documents``.  Image thumbnails are generated on first request
+and cached on disk.
+"""
+import functools
+import hashlib
+import os
+import tempfile
+
+import db
+
+
+DOCUMENT_DIR = os.environ.get("HARVESTPAY_DOCUMENT_DIR", "documents")
+CHUNK_SIZE = 1024 * 1024
+THUMBNAIL_SIZE = 256
+
+
+def document_path(digest):
+    return os.path.join(DOCUMENT_DIR, digest[:2], digest)
+
+
+def store(upload, filename=None, content_type=None):
+    """Streams a binary file-like object into the store and returns its SHA-256 digest.
+
+    Content that is already stored is not written again.
+    """
+    os.makedirs(DOCUMENT_DIR, exist_ok=True)
+    if hasattr(upload, "seek"):
+        upload.seek(0)
+    hasher = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=DOCUMENT_DIR, prefix=".upload-", delete=False) as tmp:
+        try:
+            for chunk in iter(lambda: upload.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    digest = hasher.hexdigest()
+    target = document_path(digest)
+    if os.path.exists(target):
+        os.remove(tmp.name)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp.name, target)
+    db.record_document(digest, size, filename, content_type)
+    return digest
+
+
+def read(digest):
+    """Returns a stored document's bytes, read straight from disk into a single buffer.
+
+    Meant for downloads, which Streamlit serves from memory in any case; call
+    it only when the file is actually requested.
+    """
+    with open(document_path(digest), "rb") as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=1024)
+def thumbnail(digest, size=THUMBNAIL_SIZE):
+    """Returns the path of a PNG thumbnail for an image document, or None if it is not an image.
+
+    Thumbnails are generated on first request and kept on disk.  Files Pillow
+    cannot read, including images too large to decode safely, get none.
+    """
+    from PIL import Image  # Pillow ships with Streamlit; only needed when a thumbnail is built
+
+    thumb = os.path.join(DOCUMENT_DIR, "thumbnails", f"{digest}-{size}.png")
+    if os.path.exists(thumb):
+        return thumb
+    try:
+        with Image.open(document_path(digest)) as image:
+            image.draft("RGB", (size, size))  # lets JPEG decode at reduced scale
+            image.thumbnail((size, size))
+            os.makedirs(os.path.dirname(thumb), exist_ok=True)
+            tmp = f"{thumb}.{os.getpid()}.tmp"
+            image.save(tmp, format="PNG")
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    os.replace(tmp, thumb)
+    return thumb
@@ -0,0 +1,341 @@
+"""In-process timing, query counting and Prometheus export.
+
+Timings are recorded with :func:`timed`, usable as a context manager or a
+decorator.  Every statement run on a pooled database connection is counted
+and timed (see :class:`InstrumentedConnection`), per process and per script
+rerun; statements slower than ``SLOW_QUERY_MS`` go to a slow-query log with
+their literals redacted (parameters are never recorded).
+
+:func:`render_prometheus` returns everything in the Prometheus text format.
+Setting ``HARVESTPAY_METRICS_FILE`` has :func:`start_exporter` rewrite that
+file periodically (for a node_exporter textfile collector), and
+``HARVESTPAY_METRICS_PORT`` serves ``/metrics`` over HTTP.
+"""
+import bisect
+import collections
+import contextlib
+import functools
+import http.server
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+ENABLED = os.environ.get("HARVESTPAY_INSTRUMENTATION", "1") == "1"
+SLOW_QUERY_MS = float(os.environ.get("HARVESTPAY_SLOW_QUERY_MS", "50"))
+METRICS_FILE = os.environ.get("HARVESTPAY_METRICS_FILE")
+METRICS_PORT = int(os.environ.get("HARVESTPAY_METRICS_PORT", "0"))
+EXPORT_INTERVAL = 15.0   # seconds between metrics file rewrites
+RECENT_SAMPLES = 500     # per-page rerun latencies kept for percentiles
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_query_log = logging.getLogger("harvestpay.slow_query")
+logger = logging.getLogger("harvestpay.metrics")
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class SlowQuery:
+    __slots__ = ("sql", "count", "total_ms", "max_ms", "last_seen")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen = 0.0
+
+
+_lock = threading.Lock()
+_counters = collections.defaultdict(float)      # (name, labels): value
+_histograms = collections.defaultdict(Histogram)
+_recent_reruns = collections.defaultdict(lambda: collections.deque(maxlen=RECENT_SAMPLES))
+_slow_queries = {}                               # redacted SQL: SlowQuery
+_rerun = threading.local()                       # Streamlit runs each rerun on its own thread
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def increment(name, amount=1, **labels):
+    with _lock:
+        _counters[name, _labels(labels)] += amount
+
+
+def observe(name, seconds, **labels):
+    with _lock:
+        _histograms[name, _labels(labels)].observe(seconds)
+
+
+class timed:
+    """Records the duration of a block or function call in the ``harvestpay_<name>_seconds`` histogram.
+
+        with instrumentation.timed("smtp_send"):
+            ...
+
+        @instrumentation.timed("login")
+        def authenticate(...):
+    """
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(f"harvestpay_{self.name}_seconds", time.perf_counter() - self._start, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(self.name, **self.labels):  # a fresh timer per call, so threads never share one
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+# ------------------------------
+# QUERIES
+# ------------------------------
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def redact(sql):
+    """Returns the statement with string and numeric literals replaced by ``?`` and whitespace collapsed."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+@functools.lru_cache(maxsize=1024)
+def _query_keys(sql):
+    """Returns the statement kind and its counter and histogram keys, computed once per distinct SQL string."""
+    kind = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "UNKNOWN"
+    labels = (("kind", kind),)
+    return kind, ("harvestpay_db_queries_total", labels), ("harvestpay_db_query_seconds", labels)
+
+
+def record_query(sql, seconds):
+    kind, counter, histogram = _query_keys(sql)
+    with _lock:
+        _counters[counter] += 1
+        _histograms[histogram].observe(seconds)
+    if getattr(_rerun, "active", False):
+        _rerun.queries += 1
+    elapsed_ms = seconds * 1000
+    if elapsed_ms >= SLOW_QUERY_MS:
+        statement = redact(sql)
+        increment("harvestpay_db_slow_queries_total", kind=kind)
+        with _lock:
+            entry = _slow_queries.get(statement) or _slow_queries.setdefault(statement, SlowQuery(statement))
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.last_seen = time.time()
+        slow_query_log.warning("slow query (%.1f ms): %s", elapsed_ms, statement)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that times and counts ``execute``/``executemany``, for callers such as pandas that use cursors."""
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A sqlite3 connection that times and counts every ``execute``/``executemany``.
+
+    Statements run through its cursors (``pd.read_sql_query`` uses one) are
+    counted too.  For a SELECT the time covers running the statement to its
+    first row; fetching the rest happens later on the cursor.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+
+def connection_factory():
+    """Returns the sqlite3 connection class the pool should use."""
+    return InstrumentedConnection if ENABLED else sqlite3.Connection
+
+
+# ------------------------------
+# RERUNS
+# ------------------------------
+
+@contextlib.contextmanager
+def rerun(page):
+    """Measures one script rerun of ``page``: its latency and how many queries it ran."""
+    _rerun.active = True
+    _rerun.queries = 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        queries = _rerun.queries
+        _rerun.active = False
+        observe("harvestpay_rerun_seconds", elapsed, page=page)
+        increment("harvestpay_rerun_queries_total", queries, page=page)
+        with _lock:
+            _recent_reruns[page].append((elapsed, queries))
+
+
+def rerun_summary():
+    """Returns {page: (reruns, p50 ms, p95 ms, mean queries)} over each page's recent reruns."""
+    with _lock:
+        recent = {page: list(samples) for page, samples in _recent_reruns.items()}
+    summary = {}
+    for page, samples in sorted(recent.items()):
+        latencies = sorted(elapsed for elapsed, _ in samples)
+        summary[page] = (len(samples),
+                         latencies[int(0.5 * (len(latencies) - 1))] * 1000,
+                         latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+                         sum(queries for _, queries in samples) / len(samples))
+    return summary
+
+
+def slow_queries(limit=10):
+    """Returns the slowest statements as (redacted SQL, count, mean ms, max ms), worst first."""
+    with _lock:
+        entries = sorted(_slow_queries.values(), key=lambda entry: entry.max_ms, reverse=True)[:limit]
+        return [(entry.sql, entry.count, entry.total_ms / entry.count, entry.max_ms) for entry in entries]
+
+
+def operation_summary():
+    """Returns {(histogram name, labels): (count, mean ms)} for every recorded histogram."""
+    with _lock:
+        return {key: (hist.count, hist.sum / hist.count * 1000 if hist.count else 0.0)
+                for key, hist in _histograms.items()}
+
+
+# ------------------------------
+# PROMETHEUS EXPORT
+# ------------------------------
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus():
+    """Returns every counter and histogram in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, (list(hist.counts), hist.count, hist.sum)) for key, hist in _histograms.items())
+    lines, typed = [], set()
+    for (name, labels), value in counters:
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), (counts, count, total) in histograms:
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, bucket in zip((*BUCKETS, "+Inf"), counts):
+            cumulative += bucket
+            le = bound if bound == "+Inf" else f"{bound:g}"
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Atomically rewrites ``path`` with the current metrics."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _write_periodically(path, interval):
+    while True:
+        try:
+            write_prometheus(path)
+        except OSError:
+            logger.exception("Metrics export error")
+        time.sleep(interval)
+
+
+def start_exporter(path=METRICS_FILE, port=METRICS_PORT, interval=EXPORT_INTERVAL):
+    """Starts the configured exporters (metrics file and/or HTTP endpoint) in daemon threads.
+
+    Returns the HTTP server, if one was started.
+    """
+    if path:
+        threading.Thread(target=_write_periodically, args=(path, interval), name="metrics-file",
+                         daemon=True).start()
+    if not port:
+        return None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
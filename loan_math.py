@@ -0,0 +1,112 @@
+"""Loan arithmetic: EMIs, amortization schedules and portfolio cash-flow projections.
+
+Rates are annual percentages and tenures are in months.  The functions accept
+NumPy arrays (or anything that broadcasts), so a whole grid of (amount, rate,
+tenure) combinations or an entire loan book is computed in one call.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import db
+
+
+REPAYMENT_MONTHS = {"6 months": 6, "1 year": 12, "2 years": 24, "3 years": 36, "5 years": 60}
+DEFAULT_PORTFOLIO_RATE = 10.0
+
+
+def emi(amount, annual_rate, months):
+    """Returns the equated monthly instalment, broadcasting over array arguments.
+
+    A 0% rate is repaid in equal principal instalments rather than dividing
+    by zero.
+    """
+    amount = np.asarray(amount, dtype=float)
+    months = np.asarray(months, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 100 / 12
+    growth = (1 + monthly_rate) ** months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(monthly_rate == 0, amount / months, amount * monthly_rate * growth / (growth - 1))
+
+
+def amortization_schedule(amount, annual_rate, months):
+    """Returns the month-by-month repayment schedule of one loan as a DataFrame."""
+    monthly_rate = annual_rate / 100 / 12
+    payment = float(emi(amount, annual_rate, months))
+    month = np.arange(1, months + 1)
+    if monthly_rate == 0:
+        balance = amount - payment * month
+    else:
+        growth = (1 + monthly_rate) ** month
+        balance = amount * growth - payment * (growth - 1) / monthly_rate
+    balance = np.maximum(balance, 0)
+    interest = np.concatenate(([amount], balance[:-1])) * monthly_rate
+    return pd.DataFrame({
+        "Month": month,
+        "EMI (₹)": np.full(months, payment).round(2),
+        "Interest (₹)": interest.round(2),
+        "Principal (₹)": (payment - interest).round(2),
+        "Balance (₹)": balance.round(2),
+    })
+
+
+def emi_grid(amount, rates, tenures):
+    """Returns EMIs for every (rate, tenure) pair: one row per rate, one column per tenure label.
+
+    ``tenures`` maps column labels to months, e.g. :data:`REPAYMENT_MONTHS`.
+    """
+    rates = np.asarray(rates, dtype=float)
+    months = np.fromiter(tenures.values(), dtype=float)
+    grid = emi(amount, rates[:, None], months[None, :])
+    return pd.DataFrame(grid.round(2), index=[f"{rate:g}%" for rate in rates], columns=list(tenures))
+
+
+# ------------------------------
+# PORTFOLIO PROJECTION
+# ------------------------------
+
+def project_collections(amounts, annual_rates, months, first_payment, horizon):
+    """Returns expected EMI collections for each of the next ``horizon`` months.
+
+    ``first_payment`` is each loan's first instalment as a month offset from
+    now (negative for loans already being repaid).  Every loan adds a
+    constant EMI over a contiguous range of months, so the total is built
+    from a difference array in O(loans + horizon) rather than a
+    loans-by-months matrix.
+    """
+    payments = emi(amounts, annual_rates, months)
+    first_payment = np.asarray(first_payment, dtype=np.int64)
+    start = np.clip(first_payment, 0, horizon)
+    end = np.clip(first_payment + np.asarray(months, dtype=np.int64), 0, horizon)
+    diff = np.zeros(horizon + 1)
+    np.add.at(diff, start, payments)
+    np.add.at(diff, end, -payments)
+    return np.cumsum(diff[:horizon])
+
+
+def load_approved_loans():
+    """Returns amount, repayment_months and approval date for every approved loan."""
+    with db.connection() as conn:
+        return pd.read_sql_query(
+            "SELECT l.amount, l.repayment_months, "
+            "COALESCE((SELECT MAX(d.decided_at) FROM loan_decisions d WHERE d.loan_id = l.id), l.Date) AS approved_at "
+            "FROM loan_history l WHERE l.status = 'Approved'", conn)
+
+
+def portfolio_projection(annual_rate=DEFAULT_PORTFOLIO_RATE, horizon=60, default_months=12, today=None):
+    """Projects monthly collections across all approved loans.
+
+    Repayment starts the month after approval.  Loans without a recorded
+    tenure use ``default_months``.
+    """
+    today = today or datetime.date.today()
+    loans = load_approved_loans()
+    approved = pd.to_datetime(loans["approved_at"], errors="coerce")
+    approved = approved.fillna(pd.Timestamp(today))
+    first_payment = ((approved.dt.year - today.year) * 12 + (approved.dt.month - today.month) + 1).to_numpy()
+    months = loans["repayment_months"].fillna(default_months).to_numpy()
+    collections = project_collections(loans["amount"].fillna(0).to_numpy(), annual_rate, months,
+                                      first_payment, horizon)
+    periods = pd.period_range(pd.Timestamp(today).to_period("M"), periods=horizon, freq="M")
+    return pd.DataFrame({"Month": periods.astype(str), "Collections (₹)": collections.round(2)})
@@ -0,0 +1,129 @@
+"""Contributor-to-loan matching.
+
+Contributors form an order book of offers: the capital they have left to lend
+at their preferred rate.  A loan is filled first from the contributor the
+farmer chose, then from the cheapest remaining offers, split across as many
+contributors as it takes.  Each fill pops or adjusts the top of a rate-ordered
+heap, so matching L loans against C contributors costs O((L + C) log C).
+
+Fills are stored in ``loan_allocations``; triggers keep each contributor's
+committed capital in step and release a loan's allocations when it is
+rejected.
+"""
+import heapq
+import math
+
+import db
+
+
+class OrderBook:
+    """Contributor offers ordered by rate, cheapest first."""
+
+    def __init__(self, offers):
+        """``offers`` holds (username, rate, available) tuples; ``available`` None means no limit."""
+        self.rates = {}
+        self.available = {}
+        self._heap = []
+        for username, rate, available in offers:
+            available = math.inf if available is None else available
+            if available > 0:
+                self.rates[username] = rate
+                self.available[username] = available
+                self._heap.append((rate, username))
+        heapq.heapify(self._heap)
+
+    def fill(self, amount, preferred=None, max_rate=None):
+        """Reserves ``amount`` and returns its (username, amount, rate) fills.
+
+        The ``preferred`` contributor is filled first, whatever their rate;
+        the rest comes from the cheapest offers at or below ``max_rate``.
+        Loans are funded in full or not at all: if the book cannot cover the
+        amount it is left unchanged and None is returned.
+        """
+        planned = {}
+        remaining = amount
+        if self.available.get(preferred, 0) > 0:
+            planned[preferred] = min(remaining, self.available[preferred])
+            remaining -= planned[preferred]
+
+        popped = []
+        while remaining > 0 and self._heap:
+            rate, username = self._heap[0]
+            if max_rate is not None and rate > max_rate:
+                break
+            left = self.available[username] - planned.get(username, 0)
+            if left <= 0:
+                popped.append(heapq.heappop(self._heap))
+                continue
+            take = min(remaining, left)
+            planned[username] = planned.get(username, 0) + take
+            remaining -= take
+            if take == left:
+                popped.append(heapq.heappop(self._heap))
+
+        if remaining > 0:
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
+            return None
+        # Offers popped above are exhausted by this fill and stay off the heap
+        for username, take in planned.items():
+            self.available[username] -= take
+        return [(username, take, self.rates[username]) for username, take in planned.items()]
+
+
+def blended_rate(fills):
+    """Returns the amount-weighted rate of a loan's fills."""
+    total = sum(amount for _, amount, _ in fills)
+    return sum(amount * rate for _, amount, rate in fills) / total if total else None
+
+
+def load_book(conn):
+    rows = conn.execute(
+        "SELECT contributor_username, MIN(preferred_rate), MAX(capacity) - MAX(committed) "
+        "FROM contributor_rates WHERE preferred_rate IS NOT NULL GROUP BY contributor_username").fetchall()
+    return OrderBook(rows)
+
+
+def _allocate(conn, book, loans, max_rate):
+    """Fills (loan_id, amount, contributor) loans from the book and stores the allocations."""
+    allocations, leads = [], []
+    for loan_id, amount, contributor in loans:
+        fills = book.fill(amount or 0, contributor, max_rate)
+        if not fills:
+            continue
+        allocations.extend((loan_id, username, take, rate) for username, take, rate in fills)
+        leads.append((max(fills, key=lambda fill: fill[1])[0], loan_id))
+    conn.executemany("INSERT INTO loan_allocations (loan_id, contributor_username, amount, rate) VALUES (?, ?, ?, ?)",
+                     allocations)
+    # Loans submitted without a chosen contributor are credited to their largest funder
+    conn.executemany("UPDATE loan_history SET contributor = ? WHERE id = ? AND contributor IS NULL", leads)
+    return len(leads)
+
+
+def match_loan(loan_id, max_rate=None):
+    """Allocates one pending, unallocated loan; returns its (username, amount, rate) fills, or None."""
+    with db.transaction() as conn:
+        loan = conn.execute(
+            "SELECT id, amount, contributor FROM loan_history l WHERE id = ? AND status = 'Pending' "
+            "AND NOT EXISTS (SELECT 1 FROM loan_allocations a WHERE a.loan_id = l.id)", (loan_id,)).fetchone()
+        if loan is None:
+            return None
+        if not _allocate(conn, load_book(conn), [loan], max_rate):
+            return None
+        return [row[1:] for row in conn.execute(
+            "SELECT loan_id, contributor_username, amount, rate FROM loan_allocations WHERE loan_id = ? "
+            "ORDER BY amount DESC", (loan_id,))]
+
+
+def match_pending(max_rate=None):
+    """Allocates every pending, unallocated loan, oldest first, in one pass and one transaction.
+
+    Returns (matched, unmatched) loan counts.  Loans the book cannot fully
+    fund stay unallocated for a later pass.
+    """
+    with db.transaction() as conn:
+        loans = conn.execute(
+            "SELECT id, amount, contributor FROM loan_history l WHERE status = 'Pending' "
+            "AND NOT EXISTS (SELECT 1 FROM loan_allocations a WHERE a.loan_id = l.id) ORDER BY id").fetchall()
+        matched = _allocate(conn, load_book(conn), loans, max_rate)
+    return matched, len(loans) - matched
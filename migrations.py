@@ -0,0 +1,352 @@
+"""Versioned schema migrations.
+
+Each entry in ``MIGRATIONS`` is a list of statements that moves the schema one
+version forward; a statement may also be a function of the connection, for
+data changes SQL cannot express.  The applied version is stored in SQLite's ``user_version``
+header field, so :func:`migrate` is a no-op once the database is current.
+Append new migrations to the end of the list; never edit one that has shipped.
+
+Databases created before migrations existed start at version 0, and
+migration 1 adopts their tables as they are; :func:`reconcile_baseline`
+first rebuilds any of those tables that lack a column later migrations rely on.
+"""
+import cards
+import db
+
+
+# Incrementally maintained loan summaries: (table, key columns, key expressions
+# over a loan_history row).  Used to build migration 8's triggers and backfill.
+LOAN_SUMMARIES = [
+    ("loan_summary_status", ["status"], ["COALESCE({row}status, 'Unknown')"]),
+    ("loan_summary_daily", ["day", "status"],
+     ["COALESCE(date({row}Date), 'Unknown')", "COALESCE({row}status, 'Unknown')"]),
+    ("loan_summary_contributor", ["contributor", "status"],
+     ["COALESCE({row}contributor, 'Unassigned')", "COALESCE({row}status, 'Unknown')"]),
+]
+
+
+def _summary_statements(actions_only=False):
+    """Builds the summary tables, their backfill and the triggers that keep them current.
+
+    With ``actions_only``, returns just the trigger actions that add a NEW row
+    to the summaries and remove an OLD one.
+    """
+    statements, add_new, remove_old = [], [], []
+    for table, keys, exprs in LOAN_SUMMARIES:
+        key_list = ", ".join(keys)
+        key_columns = " ".join(f"{key} TEXT NOT NULL," for key in keys)
+        existing = ", ".join(expr.format(row="") for expr in exprs)
+        new = ", ".join(expr.format(row="NEW.") for expr in exprs)
+        old_match = " AND ".join(f"{key} = {expr.format(row='OLD.')}" for key, expr in zip(keys, exprs))
+
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} ({key_columns} loan_count INTEGER NOT NULL DEFAULT 0, "
+                          f"total_amount REAL NOT NULL DEFAULT 0, PRIMARY KEY ({key_list})) WITHOUT ROWID")
+        statements.append(f"INSERT INTO {table} ({key_list}, loan_count, total_amount) "
+                          f"SELECT {existing}, COUNT(*), SUM(COALESCE(amount, 0)) FROM loan_history "
+                          f"GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}")
+        add_new.append(f"INSERT INTO {table} ({key_list}, loan_count, total_amount) "
+                       f"VALUES ({new}, 1, COALESCE(NEW.amount, 0)) "
+                       f"ON CONFLICT ({key_list}) DO UPDATE SET loan_count = loan_count + 1, "
+                       f"total_amount = total_amount + excluded.total_amount;")
+        remove_old.append(f"UPDATE {table} SET loan_count = loan_count - 1, "
+                          f"total_amount = total_amount - COALESCE(OLD.amount, 0) WHERE {old_match};")
+
+    add_new, remove_old = " ".join(add_new), " ".join(remove_old)
+    if actions_only:
+        return add_new, remove_old
+    statements.append(f"CREATE TRIGGER IF NOT EXISTS trg_loan_summary_insert AFTER INSERT ON loan_history "
+                      f"BEGIN {add_new} END")
+    statements.append(f"CREATE TRIGGER IF NOT EXISTS trg_loan_summary_delete AFTER DELETE ON loan_history "
+                      f"BEGIN {remove_old} END")
+    statements.append(f"CREATE TRIGGER IF NOT EXISTS trg_loan_summary_update "
+                      f"AFTER UPDATE OF status, amount, contributor, Date ON loan_history "
+                      f"BEGIN {remove_old} {add_new} END")
+    return statements
+
+
+def summary_upserts():
+    """Returns statements that add every loan with ``id > ?`` to the summary tables in one grouped pass.
+
+    Bulk loaders use these in place of the per-row insert trigger.
+    """
+    statements = []
+    for table, keys, exprs in LOAN_SUMMARIES:
+        key_list = ", ".join(keys)
+        statements.append(f"INSERT INTO {table} ({key_list}, loan_count, total_amount) "
+                          f"SELECT {', '.join(expr.format(row='') for expr in exprs)}, COUNT(*), "
+                          f"SUM(COALESCE(amount, 0)) FROM loan_history WHERE id > ? "
+                          f"GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))} "
+                          f"ON CONFLICT ({key_list}) DO UPDATE SET loan_count = loan_count + excluded.loan_count, "
+                          f"total_amount = total_amount + excluded.total_amount")
+    return statements
+
+
+MIGRATIONS = [
+    # 1: baseline tables
+    [
+        '''CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    full_name TEXT NOT NULL,
+    email TEXT,
+    phone TEXT NOT NULL,
+    age INTEGER,
+    gender TEXT,
+    address TEXT,
+    land_proof TEXT,
+    bank_details TEXT,
+    farming_type TEXT,
+    credit_history TEXT,
+    verification_doc TEXT,
+    interests TEXT,
+    agreement TEXT,
+    role TEXT NOT NULL,
+    org_role TEXT,
+    gov_id TEXT,
+    username TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL
+)''',
+        # Aadhaar-based login credentials (if needed)
+        '''CREATE TABLE IF NOT EXISTS user_credentials (
+    aadhaar TEXT PRIMARY KEY,
+    username TEXT UNIQUE,
+    password_hash TEXT
+)''',
+        '''CREATE TABLE IF NOT EXISTS loan_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    aadhaar TEXT,
+    name TEXT,
+    amount REAL,
+    status TEXT,
+    Date DATETIME DEFAULT CURRENT_TIMESTAMP
+)''',
+        '''CREATE TABLE IF NOT EXISTS credit_cards (
+    aadhaar TEXT,
+    card_number TEXT,
+    limit_amount REAL,
+    activation_code TEXT,
+    status TEXT
+)''',
+        '''CREATE TABLE IF NOT EXISTS contributor_rates (
+    id INTEGER PRIMARY KEY,
+    contributor_username TEXT,
+    preferred_rate REAL
+)''',
+    ],
+    # 2: indexes for the app's lookups
+    [
+        "CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)",
+        "CREATE INDEX IF NOT EXISTS idx_loan_history_status ON loan_history (status)",
+        "CREATE INDEX IF NOT EXISTS idx_loan_history_aadhaar ON loan_history (aadhaar)",
+        "CREATE INDEX IF NOT EXISTS idx_contributor_rates_username ON contributor_rates (contributor_username)",
+    ],
+    # 3: contributor catalogue sorted by rate
+    [
+        "CREATE INDEX IF NOT EXISTS idx_contributor_rates_rate ON contributor_rates (preferred_rate, contributor_username)",
+    ],
+    # 4: audit trail for verification decisions
+    [
+        '''CREATE TABLE IF NOT EXISTS loan_decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    loan_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    decided_by TEXT NOT NULL,
+    decided_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)''',
+        "CREATE INDEX IF NOT EXISTS idx_loan_decisions_loan ON loan_decisions (loan_id)",
+    ],
+    # 5: durable outbox for outbound email
+    [
+        '''CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at REAL NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL,
+    created_at REAL NOT NULL,
+    sent_at REAL
+)''',
+        "CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)",
+    ],
+    # 6: land records and stored credit scores
+    [
+        '''CREATE TABLE IF NOT EXISTS land_records (
+    aadhaar TEXT PRIMARY KEY,
+    land_size REAL,
+    crop_type TEXT
+)''',
+        "ALTER TABLE loan_history ADD COLUMN credit_score REAL",
+        "ALTER TABLE loan_history ADD COLUMN risk TEXT",
+        "ALTER TABLE loan_history ADD COLUMN scored_at DATETIME",
+    ],
+    # 7: application details kept for risk assessment, and risk-ordered review
+    [
+        "ALTER TABLE loan_history ADD COLUMN annual_income REAL",
+        "ALTER TABLE loan_history ADD COLUMN existing_loans REAL",
+        "ALTER TABLE loan_history ADD COLUMN collateral TEXT",
+        "ALTER TABLE loan_history ADD COLUMN repayment_months INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_loan_history_risk ON loan_history (status, COALESCE(credit_score, 0), id)",
+    ],
+    # 8: contributor chosen on the application, and dashboard summaries kept current by triggers
+    [
+        "ALTER TABLE loan_history ADD COLUMN contributor TEXT",
+        *_summary_statements(),
+    ],
+    # 9: metadata for content-addressed uploaded documents
+    [
+        '''CREATE TABLE IF NOT EXISTS documents (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    filename TEXT,
+    content_type TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)''',
+    ],
+    # 10: credit_cards keyed by card number, linked to its loan, with activation lockout state.
+    # Legacy rows without a card number, or repeating one already kept, are moved
+    # to credit_cards_unmigrated for an admin to resolve rather than dropped.
+    [
+        "CREATE TABLE credit_cards_unmigrated AS SELECT * FROM credit_cards WHERE card_number IS NULL "
+        "OR rowid NOT IN (SELECT MIN(rowid) FROM credit_cards GROUP BY card_number)",
+        '''CREATE TABLE credit_cards_v2 (
+    card_number TEXT PRIMARY KEY,
+    aadhaar TEXT NOT NULL,
+    limit_amount REAL,
+    activation_code TEXT,
+    status TEXT,
+    loan_id INTEGER UNIQUE,
+    issued_at DATETIME,
+    activated_at DATETIME,
+    failed_attempts INTEGER NOT NULL DEFAULT 0,
+    locked_until REAL
+)''',
+        "INSERT INTO credit_cards_v2 (card_number, aadhaar, limit_amount, activation_code, status) "
+        "SELECT card_number, COALESCE(aadhaar, ''), limit_amount, activation_code, status FROM credit_cards "
+        "WHERE rowid IN (SELECT MIN(rowid) FROM credit_cards WHERE card_number IS NOT NULL GROUP BY card_number)",
+        "DROP TABLE credit_cards",
+        "ALTER TABLE credit_cards_v2 RENAME TO credit_cards",
+        "CREATE INDEX IF NOT EXISTS idx_credit_cards_aadhaar ON credit_cards (aadhaar)",
+    ],
+    # 11: per-applicant loan history, newest first; supersedes the plain aadhaar index
+    [
+        "CREATE INDEX IF NOT EXISTS idx_loan_history_aadhaar_date ON loan_history (aadhaar, Date)",
+        "DROP INDEX IF EXISTS idx_loan_history_aadhaar",
+    ],
+    # 12: contributor capital and the allocations that split loans across contributors.
+    # A NULL capacity means the contributor declared no limit.  Triggers keep
+    # committed capital in step and release a loan's allocations when it is rejected.
+    [
+        "ALTER TABLE contributor_rates ADD COLUMN capacity REAL",
+        "ALTER TABLE contributor_rates ADD COLUMN committed REAL NOT NULL DEFAULT 0",
+        '''CREATE TABLE IF NOT EXISTS loan_allocations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    loan_id INTEGER NOT NULL,
+    contributor_username TEXT NOT NULL,
+    amount REAL NOT NULL,
+    rate REAL NOT NULL,
+    allocated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (loan_id, contributor_username)
+)''',
+        "CREATE INDEX IF NOT EXISTS idx_loan_allocations_contributor ON loan_allocations (contributor_username)",
+        "CREATE TRIGGER IF NOT EXISTS trg_allocation_insert AFTER INSERT ON loan_allocations BEGIN "
+        "UPDATE contributor_rates SET committed = committed + NEW.amount "
+        "WHERE contributor_username = NEW.contributor_username; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_allocation_delete AFTER DELETE ON loan_allocations BEGIN "
+        "UPDATE contributor_rates SET committed = committed - OLD.amount "
+        "WHERE contributor_username = OLD.contributor_username; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_loan_rejected_release AFTER UPDATE OF status ON loan_history "
+        "WHEN NEW.status = 'Rejected' BEGIN DELETE FROM loan_allocations WHERE loan_id = NEW.id; END",
+    ],
+    # 13: bulk loaders switch the per-row summary trigger off by holding a bulk_loads
+    # row inside their transaction, instead of dropping and recreating the trigger
+    [
+        "CREATE TABLE IF NOT EXISTS bulk_loads (name TEXT PRIMARY KEY) WITHOUT ROWID",
+        "DROP TRIGGER IF EXISTS trg_loan_summary_insert",
+        f"CREATE TRIGGER trg_loan_summary_insert AFTER INSERT ON loan_history "
+        f"WHEN NOT EXISTS (SELECT 1 FROM bulk_loads WHERE name = 'loan_history') "
+        f"BEGIN {_summary_statements(actions_only=True)[0]} END",
+    ],
+    # 14: activation codes are stored only as salted hashes, and cleared once a card is active
+    [
+        "ALTER TABLE credit_cards RENAME COLUMN activation_code TO activation_code_hash",
+        "UPDATE credit_cards SET activation_code_hash = NULL WHERE status = 'Active'",
+        lambda conn: _hash_activation_codes(conn, "credit_cards", "card_number", "activation_code_hash"),
+        lambda conn: _hash_activation_codes(conn, "credit_cards_unmigrated", "rowid", "activation_code"),
+    ],
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+# Columns of migration 1's tables that pre-migration databases may lack.  SQLite
+# cannot ADD COLUMN with a CURRENT_TIMESTAMP default, so such tables are rebuilt.
+BASELINE_COLUMNS = {"loan_history": ["Date"]}
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def reconcile_baseline(conn):
+    """Rebuilds legacy tables missing a ``BASELINE_COLUMNS`` column from migration 1's definition.
+
+    Rows keep their ids and the AUTOINCREMENT sequence is preserved; new
+    columns take their defaults, so legacy loans get the upgrade time as
+    their ``Date``.  Returns the names of the rebuilt tables.
+    """
+    rebuilt = []
+    for table, required in BASELINE_COLUMNS.items():
+        legacy = _columns(conn, table)
+        if not legacy or all(column in legacy for column in required):
+            continue
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        conn.execute(next(statement for statement in MIGRATIONS[0] if f"EXISTS {table} (" in statement))
+        unknown = set(legacy) - set(_columns(conn, table))
+        if unknown:
+            raise RuntimeError(f"Cannot upgrade {table}: unexpected columns {', '.join(sorted(unknown))}")
+        column_list = ", ".join(legacy)
+        conn.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {table}_legacy")
+        sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (f"{table}_legacy",)).fetchone()
+        conn.execute(f"DROP TABLE {table}_legacy")
+        if sequence:
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+        rebuilt.append(table)
+    return rebuilt
+
+
+def _hash_activation_codes(conn, table, key, column):
+    """Replaces the plaintext activation codes in ``table`` with their hashes."""
+    codes = conn.execute(f"SELECT {key}, {column} FROM {table} WHERE {column} IS NOT NULL").fetchall()
+    conn.executemany(f"UPDATE {table} SET {column} = ? WHERE {key} = ?",
+                     [(cards.hash_code(str(code)), row_key) for row_key, code in codes])
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate():
+    """Applies every pending migration and returns the resulting schema version.
+
+    The version is re-read after taking the write lock, so several processes
+    starting at once apply each migration exactly once.
+    """
+    with db.connection() as conn:
+        if schema_version(conn) >= LATEST_VERSION:
+            return schema_version(conn)
+    with db.transaction() as conn:
+        version = schema_version(conn)
+        if version == 0:
+            reconcile_baseline(conn)
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+        return schema_version(conn)
@@ -0,0 +1,302 @@
+"""Outbound email: a durable outbox drained by a background SMTP worker.
+
+Pages never talk to SMTP directly.  They call :func:`queue_feedback` or
+:func:`queue_loan_decisions`, which write to the ``outbox`` table and return
+immediately; a single daemon thread per process sends due messages in batches
+over one reused SMTP session, retrying failures with exponential backoff.
+
+Sending is disabled until ``HARVESTPAY_SENDER_EMAIL`` is set (with
+``HARVESTPAY_SENDER_PASSWORD`` for servers that require a login); messages
+queued meanwhile stay in the outbox and go out once it is configured.  Every
+setting comes from the environment, e.g. to point the worker at a local
+stand-in server::
+
+    HARVESTPAY_SENDER_EMAIL=app@example.org HARVESTPAY_SMTP_SERVER=localhost HARVESTPAY_SMTP_PORT=8025 HARVESTPAY_SMTP_STARTTLS=0
+"""
+import collections
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+import db
+import instrumentation
+
+
+# Email configuration
+SMTP_SERVER = os.environ.get("HARVESTPAY_SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("HARVESTPAY_SMTP_PORT", "587"))
+SMTP_STARTTLS = os.environ.get("HARVESTPAY_SMTP_STARTTLS", "1") == "1"
+SENDER_EMAIL = os.environ.get("HARVESTPAY_SENDER_EMAIL")
+SENDER_PASSWORD = os.environ.get("HARVESTPAY_SENDER_PASSWORD")
+RECEIVER_EMAIL = os.environ.get("HARVESTPAY_FEEDBACK_EMAIL") or SENDER_EMAIL  # Where feedback is sent
+ENABLED = bool(SENDER_EMAIL)
+
+# Worker tuning
+BATCH_SIZE = 50
+POLL_INTERVAL = 5.0      # seconds between outbox polls when idle
+IDLE_TIMEOUT = 60.0      # close the SMTP session after this long without sending
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 30.0     # first retry delay in seconds, doubled on each attempt
+COMPLETE_RETRY_MAX = 30.0  # longest wait between attempts to record a batch's results
+
+logger = logging.getLogger("harvestpay.outbox")
+
+
+# ------------------------------
+# QUEUEING
+# ------------------------------
+
+def queue_feedback(feedback):
+    """Queues a feedback email for the admin.
+
+    Without a configured feedback address the recipient is left empty and
+    filled in when the message is sent.
+    """
+    db.enqueue_messages([("feedback", RECEIVER_EMAIL or "", "New Feedback from Tenant Farmer Loan App",
+                          f"User Feedback:\n\n{feedback}")])
+    _wake_worker()
+
+
+def queue_loan_decisions(decisions, conn=None):
+    """Queues a status email for each decided (loan_id, status) whose applicant has an email on file.
+
+    Pass the transaction that applied the decisions as ``conn`` (see
+    :func:`db.decide_loans`) so the emails cannot be lost between the two.
+    """
+    statuses = dict(decisions)
+    messages = []
+    for loan_id, email, full_name, purpose, amount in db.loan_contacts(statuses, conn):
+        status = statuses[loan_id].lower()
+        messages.append((
+            "loan_status", email, f"Your loan application #{loan_id} has been {status}",
+            f"Dear {full_name},\n\n"
+            f"Your loan application for \"{purpose}\" (₹{amount:,.2f}) has been {status}.\n\n"
+            "Tenant Farmer Loan Management System"))
+    if messages:
+        db.enqueue_messages(messages, conn)
+        _wake_worker()
+    return len(messages)
+
+
+def queue_card_codes(issued, conn=None):
+    """Queues the activation code for each issued card whose holder has an email on file.
+
+    ``issued`` holds (loan_id, aadhaar, card_number, activation_code, limit_amount)
+    tuples; pass the issuing transaction as ``conn`` (see
+    :func:`cards.issue_cards_for_approved_loans`).  Returns the ids of the
+    loans whose codes were queued.
+    """
+    cards = {loan_id: (card_number, code, limit_amount) for loan_id, _, card_number, code, limit_amount in issued}
+    messages, queued = [], set()
+    for loan_id, email, full_name, _, _ in db.loan_contacts(cards, conn):
+        queued.add(loan_id)
+        card_number, code, limit_amount = cards[loan_id]
+        messages.append((
+            "card_issued", email, "Your HarvestPay credit card has been issued",
+            f"Dear {full_name},\n\n"
+            f"A credit card ending in {card_number[-4:]} with a limit of ₹{limit_amount:,.2f} has been issued to you.\n"
+            f"Activate it from the Credit Cards page with this one-time code: {code}\n\n"
+            "Tenant Farmer Loan Management System"))
+    if messages:
+        db.enqueue_messages(messages, conn)
+        _wake_worker()
+    return queued
+
+
+def build_message(recipient, subject, body):
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msg = MIMEMultipart()
+    msg['From'] = SENDER_EMAIL
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+# ------------------------------
+# SMTP SESSION
+# ------------------------------
+
+class SMTPSession:
+    """A long-lived SMTP connection that is opened lazily and reopened if the server drops it."""
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, username=SENDER_EMAIL, password=SENDER_PASSWORD,
+                 starttls=SMTP_STARTTLS, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._server = None
+
+    def _open(self):
+        import smtplib  # deferred so pages that only queue mail never load it
+
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.password:
+            server.login(self.username, self.password)
+        self._server = server
+
+    def send(self, msg):
+        if self._server is None:
+            self._open()
+        import smtplib
+
+        with instrumentation.timed("smtp_send"):
+            try:
+                self._server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._server = None
+                self._open()
+                self._server.send_message(msg)
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except OSError:  # includes smtplib.SMTPException
+            pass
+        self._server = None
+
+    @property
+    def is_open(self):
+        return self._server is not None
+
+
+# ------------------------------
+# WORKER
+# ------------------------------
+
+class OutboxWorker(threading.Thread):
+    """Drains the outbox in batches over a single reused SMTP session."""
+
+    def __init__(self, session=None, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL):
+        super().__init__(name="outbox-worker", daemon=True)
+        self.session = session or SMTPSession()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.sent = 0
+        self.failed = 0
+        self.latencies = collections.deque(maxlen=1000)  # seconds per successful send
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._last_send = 0.0
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.process_batch()
+            except Exception:  # keep the worker alive through transient database errors
+                logger.exception("Outbox worker error")
+                processed = 0
+            if processed:
+                continue
+            if self.session.is_open and time.monotonic() - self._last_send > IDLE_TIMEOUT:
+                self.session.close()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+        self.session.close()
+
+    def process_batch(self):
+        """Sends one batch of due messages and returns how many were attempted."""
+        batch = db.claim_outbox(self.worker_id, self.batch_size)
+        sent_ids, failures = [], []
+        for message_id, recipient, subject, body, attempts in batch:
+            start = time.perf_counter()
+            try:
+                self.session.send(build_message(recipient or RECEIVER_EMAIL, subject, body))
+            except OSError as e:  # includes smtplib.SMTPException
+                self.session.close()
+                attempts += 1
+                next_at = time.time() + RETRY_BACKOFF * 2 ** (attempts - 1) if attempts < MAX_ATTEMPTS else None
+                failures.append((message_id, attempts, str(e), next_at))
+                if next_at is None:
+                    self.failed += 1
+            else:
+                self.latencies.append(time.perf_counter() - start)
+                self._last_send = time.monotonic()
+                sent_ids.append(message_id)
+        if batch:
+            self._complete(sent_ids, failures)
+            self.sent += len(sent_ids)
+        return len(batch)
+
+    def _complete(self, sent_ids, failures):
+        """Records a batch's results, retrying until the write succeeds.
+
+        Messages already delivered but left 'sending' would be claimed again
+        once stale and delivered twice, so the results are never dropped.
+        """
+        delay = 1.0
+        while True:
+            try:
+                db.complete_outbox(sent_ids, failures)
+                return
+            except sqlite3.Error:
+                logger.warning("Could not record outbox results; retrying in %.0f s", delay, exc_info=True)
+            time.sleep(delay)
+            delay = min(delay * 2, COMPLETE_RETRY_MAX)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_worker(**kwargs):
+    """Starts the process-wide outbox worker if it is not already running.
+
+    Returns None without starting it when sending is not configured (see
+    ``ENABLED``), unless an explicit ``session`` is passed.
+    """
+    global _worker
+    if not ENABLED and "session" not in kwargs:
+        logger.warning("Email sending is disabled: set HARVESTPAY_SENDER_EMAIL (and HARVESTPAY_SENDER_PASSWORD) "
+                       "to enable it.")
+        return None
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker(**kwargs)
+            _worker.start()
+        return _worker
+
+
+def _wake_worker():
+    if _worker is not None:
+        _worker.wake()
+
+
+def metrics():
+    """Returns queue depth by status and send latency percentiles (ms) for this process."""
+    counts = db.outbox_counts()
+    latencies = sorted(_worker.latencies) if _worker is not None else []
+
+    def percentile(pct):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(pct / 100 * len(latencies)))] * 1000
+
+    return {
+        "queue_depth": counts.get("pending", 0) + counts.get("sending", 0),
+        "sent": counts.get("sent", 0),
+        "failed": counts.get("failed", 0),
+        "send_latency_p50_ms": percentile(50),
+        "send_latency_p99_ms": percentile(99),
+    }
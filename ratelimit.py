@@ -0,0 +1,89 @@
+"""In-memory sliding-window rate limits for login and registration.
+
+A limiter remembers, per key, the times of recent attempts inside its
+window; an attempt is refused once ``limit`` of them fall inside the last
+``window`` seconds, so a key recovers gradually rather than all at once at a
+fixed boundary.  Keys are kept in LRU order and capped at ``max_keys``, so a
+flood of distinct usernames cannot grow memory without bound (the oldest
+keys are forgotten first).
+
+Limits are per process; every setting can be overridden from the
+environment, e.g. ``HARVESTPAY_LOGIN_USER_LIMIT=10``.
+"""
+import collections
+import os
+import threading
+import time
+
+
+def _setting(name, default):
+    return float(os.environ.get(f"HARVESTPAY_{name}", default))
+
+
+class SlidingWindowLimiter:
+    """Allows at most ``limit`` attempts per key in any ``window`` seconds."""
+
+    def __init__(self, limit, window, max_keys=100_000, clock=time.monotonic):
+        self.limit = int(limit)
+        self.window = window
+        self.max_keys = max_keys
+        self.clock = clock
+        self._attempts = collections.OrderedDict()  # key: deque of attempt times, least recently used first
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Records an attempt for ``key`` if it is allowed.
+
+        Returns ``(allowed, retry_after)``; ``retry_after`` is the number of
+        seconds until the next attempt would be allowed (0 when allowed).
+        Refused attempts are not recorded, so hammering does not extend the wait.
+        """
+        now = self.clock()
+        with self._lock:
+            attempts = self._attempts.get(key)
+            if attempts is None:
+                attempts = self._attempts[key] = collections.deque()
+                if len(self._attempts) > self.max_keys:
+                    self._attempts.popitem(last=False)
+            else:
+                self._attempts.move_to_end(key)
+            while attempts and attempts[0] <= now - self.window:
+                attempts.popleft()
+            if len(attempts) >= self.limit:
+                return False, attempts[0] + self.window - now
+            attempts.append(now)
+            return True, 0.0
+
+    def check(self, key):
+        """Returns ``(allowed, retry_after)`` for ``key`` without recording an attempt."""
+        now = self.clock()
+        with self._lock:
+            attempts = self._attempts.get(key)
+            recent = [t for t in attempts if t > now - self.window] if attempts else []
+        if len(recent) >= self.limit:
+            return False, recent[0] + self.window - now
+        return True, 0.0
+
+    def reset(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def __len__(self):
+        return len(self._attempts)
+
+
+# Failed logins per (username, client): slows guessing one account's password, without
+# letting wrong guesses from elsewhere lock the owner out
+login_failures = SlidingWindowLimiter(_setting("LOGIN_USER_LIMIT", 5), _setting("LOGIN_USER_WINDOW", 300))
+# Login attempts per client, for any usernames: slows credential stuffing from one source
+login_by_client = SlidingWindowLimiter(_setting("LOGIN_CLIENT_LIMIT", 20), _setting("LOGIN_CLIENT_WINDOW", 300))
+# Registrations per client
+registrations = SlidingWindowLimiter(_setting("REGISTER_CLIENT_LIMIT", 5), _setting("REGISTER_CLIENT_WINDOW", 3600))
+
+
+def describe_wait(seconds):
+    """Formats a retry delay for a message, e.g. "45 seconds" or "4 minutes"."""
+    seconds = max(1, int(seconds + 0.999))
+    if seconds < 120:
+        return f"{seconds} seconds"
+    return f"{(seconds + 59) // 60} minutes"
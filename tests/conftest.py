@@ -0,0 +1,19 @@
+"""Shared fixtures: the application modules on sys.path and a scratch database."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import migrations  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Points the pool at a fresh, fully migrated database for the test."""
+    db.configure(str(tmp_path / "test.db"))
+    migrations.migrate()
+    yield
+    db.get_pool().close()
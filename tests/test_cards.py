@@ -0,0 +1,21 @@
+"""Card issuance and activation."""
+import cards
+import db
+
+
+def stored_code(card_number):
+    with db.connection() as conn:
+        return conn.execute("SELECT activation_code_hash FROM credit_cards WHERE card_number = ?",
+                            (card_number,)).fetchone()[0]
+
+
+def test_activation_codes_are_stored_hashed_and_cleared_on_activation(database):
+    loan_id = db.insert_loan("ravi", "Seeds", 10000.0)
+    db.decide_loans([(loan_id, "Approved")], "admin")
+    (issued,), _ = cards.issue_cards_for_approved_loans()
+    _, aadhaar, card_number, code, _ = issued
+
+    assert code not in stored_code(card_number)
+    assert cards.activate_card(aadhaar, card_number, "x" + code)[0] is False
+    assert cards.activate_card(aadhaar, card_number, code) == (True, "Card activated successfully!")
+    assert stored_code(card_number) is None
@@ -0,0 +1,15 @@
+from views.common import client_address
+
+
+def test_peer_address_without_proxies():
+    assert client_address("1.1.1.1", "10.0.0.5", trusted_proxies=0) == "10.0.0.5"
+
+
+def test_forwarded_entry_from_trusted_proxy():
+    # The client prepended a spoofed entry; the proxy appended the real address
+    assert client_address("6.6.6.6, 203.0.113.7", "10.0.0.5", trusted_proxies=1) == "203.0.113.7"
+    assert client_address("6.6.6.6, 203.0.113.7, 10.0.0.9", "10.0.0.5", trusted_proxies=2) == "203.0.113.7"
+
+
+def test_missing_forwarded_header_is_unknown():
+    assert client_address(None, "10.0.0.5", trusted_proxies=1) is None
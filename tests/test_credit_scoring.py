@@ -0,0 +1,34 @@
+"""The re-score job against stored loans and land records."""
+import io
+
+import pandas as pd
+
+import bulk
+import credit_scoring
+import db
+
+
+def scores():
+    with db.connection() as conn:
+        return conn.execute("SELECT aadhaar, credit_score, risk FROM loan_history ORDER BY id").fetchall()
+
+
+def test_rescore_keeps_scores_it_cannot_recompute(database):
+    bulk.import_file("loans", io.BytesIO(b"aadhaar,name,amount,credit_score,risk\nravi,Seeds,1000,720,Low\n"))
+    assert credit_scoring.rescore_loans() == 0
+    assert scores() == [("ravi", 720.0, "Low")]
+
+
+def test_rescore_uses_land_records_keyed_by_username(database):
+    db.insert_loan("sita", "Seeds", 1000.0)
+    bulk.import_file("land_records", io.BytesIO(b"aadhaar,land_size,crop_type\nsita,20,Paddy\n"))
+    assert credit_scoring.rescore_loans() == 1
+    assert scores() == [("sita", credit_scoring.land_score("sita"), "Low")]
+
+
+def test_batch_scores_match_land_score(database):
+    bulk.import_file("land_records", io.BytesIO(b"aadhaar,land_size,crop_type\nsita,20,Paddy\n123456789012,4,\n"))
+    land = credit_scoring.load_land_data()
+    batch = credit_scoring.score_batch(["sita", "123456789012", "nobody"], land)["credit_score"].tolist()
+    assert batch[:2] == [credit_scoring.land_score("sita"), credit_scoring.land_score("123456789012")]
+    assert pd.isna(batch[2])
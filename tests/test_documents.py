@@ -0,0 +1,20 @@
+"""Stored documents and their thumbnails."""
+import io
+import struct
+import zlib
+
+import documents
+
+
+def png_header(width, height):
+    """A PNG with a valid header claiming ``width`` x ``height`` pixels and no image data."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IEND", b""))
+
+
+def test_oversized_image_gets_no_thumbnail(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(documents, "DOCUMENT_DIR", str(tmp_path / "documents"))
+    digest = documents.store(io.BytesIO(png_header(20000, 20000)), "scan.png", "image/png")
+    assert documents.thumbnail(digest) is None
@@ -0,0 +1,19 @@
+import sqlite3
+
+import pandas as pd
+
+import instrumentation
+
+
+def queries_counted(kind):
+    return instrumentation._counters[("harvestpay_db_queries_total", (("kind", kind),))]
+
+
+def test_cursor_queries_are_counted_once():
+    conn = sqlite3.connect(":memory:", factory=instrumentation.InstrumentedConnection)
+    before = queries_counted("SELECT")
+    conn.execute("SELECT 1")
+    pd.read_sql_query("SELECT 1 AS one", conn)
+    conn.cursor().execute("SELECT 2")
+    assert queries_counted("SELECT") - before == 3
+    conn.close()
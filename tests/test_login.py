@@ -0,0 +1,28 @@
+"""Rate-limited login."""
+import pytest
+
+import auth
+import db
+import ratelimit
+
+
+@pytest.fixture
+def owner(database, monkeypatch):
+    monkeypatch.setattr(ratelimit, "login_failures", ratelimit.SlidingWindowLimiter(5, 300))
+    monkeypatch.setattr(ratelimit, "login_by_client", ratelimit.SlidingWindowLimiter(20, 300))
+    db.insert_user(full_name="Ravi", phone="1", role="Farmer", username="ravi",
+                   password=auth.hash_password("correct horse"))
+
+
+def test_failures_elsewhere_do_not_lock_the_owner_out(owner):
+    for attempt in range(10):
+        auth.login("ravi", f"wrong{attempt}", "ip:203.0.113.66")
+    assert auth.login("ravi", "wrong", "ip:203.0.113.66")[1] > 0
+    user, retry_after = auth.login("ravi", "correct horse", "ip:198.51.100.7")
+    assert user is not None and retry_after == 0
+
+
+def test_unknown_clients_skip_the_client_limit(owner):
+    for attempt in range(30):
+        auth.login(f"nobody{attempt}", "wrong", None)
+    assert auth.login("ravi", "correct horse", None)[0] is not None
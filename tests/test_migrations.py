@@ -0,0 +1,107 @@
+"""Schema upgrades, including the pre-migration database shipped in Harvest_Pay-main.zip."""
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+import cards
+import db
+import migrations
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEGACY_ARCHIVE = os.path.join(ROOT, "Harvest_Pay-main.zip")
+LEGACY_MEMBER = "Harvest_Pay-main/farmer_data.db"
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """A copy of the legacy farmer_data.db: version 0, loan_history without a Date column."""
+    path = tmp_path / "farmer_data.db"
+    with zipfile.ZipFile(LEGACY_ARCHIVE) as archive:
+        path.write_bytes(archive.read(LEGACY_MEMBER))
+    yield str(path)
+    db.get_pool().close()
+
+
+def columns(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    finally:
+        conn.close()
+
+
+def test_legacy_database_upgrades_to_latest(legacy_db):
+    conn = sqlite3.connect(legacy_db)
+    legacy_loans = conn.execute("SELECT id, aadhaar, name, amount, status FROM loan_history ORDER BY id").fetchall()
+    legacy_cards = conn.execute("SELECT COUNT(*) FROM credit_cards").fetchone()[0]
+    conn.close()
+    assert "Date" not in columns(legacy_db, "loan_history")
+
+    db.configure(legacy_db)
+    assert migrations.migrate() == migrations.LATEST_VERSION
+    assert migrations.migrate() == migrations.LATEST_VERSION  # idempotent
+
+    assert "Date" in columns(legacy_db, "loan_history")
+    with db.connection() as conn:
+        upgraded = conn.execute("SELECT id, aadhaar, name, amount, status FROM loan_history ORDER BY id").fetchall()
+        assert conn.execute("SELECT COUNT(*) FROM loan_history WHERE Date IS NULL").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM credit_cards").fetchone()[0] == legacy_cards
+    assert upgraded == legacy_loans
+
+    # The queries behind Verification, Dashboard and Loan History run on the upgraded data
+    assert len(db.pending_loans_page(limit=50)) == sum(1 for loan in legacy_loans if loan[4] == "Pending")
+    assert sum(count for _, count, _ in db.summary_by_status()) == len(legacy_loans)
+    aadhaar = legacy_loans[0][1]
+    assert [loan.id for loan in db.loan_history_page(aadhaar)] == sorted(
+        (loan[0] for loan in legacy_loans if loan[1] == aadhaar), reverse=True)
+
+    # New loans continue the legacy id sequence
+    assert db.insert_loan(aadhaar, "Seeds", 1000.0) == max(loan[0] for loan in legacy_loans) + 1
+
+
+def test_fresh_database_migrates(tmp_path):
+    db.configure(str(tmp_path / "fresh.db"))
+    try:
+        assert migrations.migrate() == migrations.LATEST_VERSION
+        assert db.pending_loans_page() == []
+    finally:
+        db.get_pool().close()
+
+
+def test_legacy_database_gets_dashboard_summaries_and_history_index(legacy_db):
+    db.configure(legacy_db)
+    migrations.migrate()
+    with db.connection() as conn:
+        loans = conn.execute("SELECT COUNT(*), SUM(amount) FROM loan_history").fetchone()
+        daily = conn.execute("SELECT SUM(loan_count), SUM(total_amount) FROM loan_summary_daily "
+                             "WHERE day != 'Unknown'").fetchone()
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(loan_history)")}
+    assert daily == loans  # migration 8 backfilled every legacy loan under a real day
+    assert "idx_loan_history_aadhaar_date" in indexes  # migration 11
+    assert sum(row[2] for row in db.summary_by_day("2000-01-01")) == loans[0]
+
+
+def test_legacy_cards_without_a_unique_number_are_kept_aside(legacy_db):
+    conn = sqlite3.connect(legacy_db)
+    card_number, code = conn.execute("SELECT card_number, activation_code FROM credit_cards").fetchone()
+    legacy_cards = conn.execute("SELECT COUNT(*) FROM credit_cards").fetchone()[0]
+    with conn:
+        conn.execute("INSERT INTO credit_cards (aadhaar, card_number, limit_amount, activation_code, status) "
+                     "VALUES ('1', NULL, 100, '1111', 'Inactive'), ('2', ?, 200, '2222', 'Inactive')",
+                     (card_number,))
+    conn.close()
+
+    db.configure(legacy_db)
+    migrations.migrate()
+    assert db.count_unmigrated_cards() == 2
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM credit_cards").fetchone()[0] == legacy_cards
+        stored = conn.execute("SELECT activation_code_hash FROM credit_cards WHERE card_number = ?",
+                              (card_number,)).fetchone()[0]
+        set_aside = [row[0] for row in conn.execute("SELECT activation_code FROM credit_cards_unmigrated")]
+    # Plaintext codes are replaced by their hashes in both tables
+    assert stored != code and cards.code_matches(code, stored)
+    assert "1111" not in set_aside and "2222" not in set_aside
@@ -0,0 +1,79 @@
+"""Emails queued in the same transaction as the change they report."""
+import sqlite3
+
+import pytest
+
+import cards
+import db
+import notifications
+
+
+@pytest.fixture
+def ravi(database):
+    """A farmer with an email on file."""
+    db.insert_user(full_name="Ravi", phone="1", email="ravi@example.org", role="Farmer", username="ravi",
+                   password="x")
+
+
+def outbox():
+    with db.connection() as conn:
+        return conn.execute("SELECT kind, recipient FROM outbox ORDER BY id").fetchall()
+
+
+def status(loan_id):
+    with db.connection() as conn:
+        return conn.execute("SELECT status FROM loan_history WHERE id = ?", (loan_id,)).fetchone()[0]
+
+
+def test_decision_emails_commit_with_the_decisions(ravi):
+    loan_id = db.insert_loan("ravi", "Seeds", 10000.0)
+    assert db.decide_loans([(loan_id, "Approved")], "admin", notify=notifications.queue_loan_decisions)
+    assert outbox() == [("loan_status", "ravi@example.org")]
+
+    issued, emailed = cards.issue_cards_for_approved_loans(notify=notifications.queue_card_codes)
+    assert emailed == {issued[0][0]}
+    assert outbox()[-1] == ("card_issued", "ravi@example.org")
+
+
+def test_failed_notification_rolls_back_the_decisions(ravi):
+    loan_id = db.insert_loan("ravi", "Seeds", 10000.0)
+
+    def fail(applied, conn):
+        notifications.queue_loan_decisions(applied, conn)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    with pytest.raises(sqlite3.OperationalError):
+        db.decide_loans([(loan_id, "Approved")], "admin", notify=fail)
+    assert status(loan_id) == "Pending"
+    assert outbox() == []
+
+
+class RecordingSession:
+    def __init__(self):
+        self.sent = []
+        self.is_open = False
+
+    def send(self, msg):
+        self.sent.append(msg["To"])
+
+    def close(self):
+        pass
+
+
+def test_delivered_messages_are_recorded_even_if_the_first_write_fails(ravi, monkeypatch):
+    notifications.queue_feedback("Thanks")
+    complete = db.complete_outbox
+    calls = []
+
+    def locked_once(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        complete(*args)
+
+    monkeypatch.setattr(db, "complete_outbox", locked_once)
+    monkeypatch.setattr(notifications.time, "sleep", lambda seconds: None)
+    worker = notifications.OutboxWorker(session=RecordingSession())
+    assert worker.process_batch() == 1
+    assert len(calls) == 2 and worker.sent == 1
+    assert db.outbox_counts() == {"sent": 1}
@@ -0,0 +1,17 @@
+"""The connection pool."""
+import sqlite3
+
+import pytest
+
+import db
+
+
+def test_exhausted_pool_times_out(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.connection():
+                pass
+    with pool.connection() as conn:  # the held connection went back to the pool
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+    pool.close()
@@ -0,0 +1,31 @@
+"""Streamlit pages, one module per sidebar entry.
+
+Each module defines ``render()``.  ``app.py`` imports only the selected
+page, so a rerun executes one page's code and a cold start does not pay for
+libraries (pandas, plotly, NumPy) that only some pages use.  Imported
+modules stay in ``sys.modules``, so later reruns skip parsing them again.
+"""
+import importlib
+
+
+# Sidebar label: module name
+PAGES = {
+    "Home": "home",
+    "Features": "features",
+    "Register": "register",
+    "Login": "login",
+    "Loan Application": "loan_application",
+    "Verification": "verification",
+    "Dashboard": "dashboard",
+    "Credit Cards": "credit_cards",
+    "Loan History": "loan_history",
+    "Profile": "profile",
+    "Bulk Data": "bulk_data",
+    "Performance": "performance",
+    "Feedback System": "feedback",
+}
+
+
+def render(label):
+    """Imports the page for a sidebar label (once per process) and renders it."""
+    importlib.import_module(f"{__name__}.{PAGES[label]}").render()
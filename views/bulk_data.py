@@ -0,0 +1,77 @@
+"""Admins' bulk import of farmers, contributors, loans and land records, and loan history export."""
+import functools
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+import bulk
+from views.common import load_contributor_page, load_review_page
+
+
+IMPORT_KINDS = {"Farmers": "farmers", "Contributors": "contributors", "Historical Loans": "loans",
+                "Land Records": "land_records"}
+EXPORT_FORMATS = {"CSV": ("csv", "text/csv"), "Parquet": ("parquet", "application/vnd.apache.parquet")}
+
+
+def export_loan_history(fmt):
+    """Writes the loan history to a temporary file with bulk.export_loans and returns the file's bytes.
+
+    The export streams rows to disk a chunk at a time; Streamlit then keeps
+    the finished file in memory to serve the download.
+    """
+    fd, path = tempfile.mkstemp(prefix="loan_history-", suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        bulk.export_loans(path, fmt)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def render():
+    st.title("📦 Bulk Import & Export")
+
+    if 'logged_in' in st.session_state and st.session_state['logged_in']:
+        if st.session_state.get('role', None) == "Admin":
+            st.subheader("Bulk Import")
+            kind = st.selectbox("Import", list(IMPORT_KINDS))
+            columns = {name: required for name, (_, required) in bulk.IMPORTS[IMPORT_KINDS[kind]][0].items()}
+            st.caption("Required columns: " + ", ".join(name for name, required in columns.items() if required)
+                       + ("; password (or an scrypt password_hash)" if IMPORT_KINDS[kind] in bulk.USER_KINDS else "")
+                       + ". Optional: " + ", ".join(name for name, required in columns.items() if not required))
+            upload = st.file_uploader("CSV or Parquet file", type=["csv", "parquet", "pq"])
+
+            if upload is not None and st.button("Import File"):
+                progress = st.empty()
+                try:
+                    imported, rejected, errors = bulk.import_file(
+                        IMPORT_KINDS[kind], upload, bulk.file_format(upload.name),
+                        progress=lambda done, failed: progress.write(f"Imported {done:,} row(s) so far..."))
+                    progress.empty()
+                    load_contributor_page.clear()
+                    load_review_page.clear()
+                    st.success(f"Imported {imported:,} row(s); {rejected:,} row(s) rejected.")
+                    if errors:
+                        st.dataframe(pd.DataFrame(errors, columns=["Row", "Error"]), hide_index=True)
+                        if rejected > len(errors):
+                            st.caption(f"Showing the first {len(errors):,} errors.")
+                except ValueError as e:
+                    st.error(str(e))
+                except sqlite3.Error as e:
+                    st.error(f"Database error: {e}")
+
+            st.subheader("Export Loan History")
+            export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+            fmt, mime = EXPORT_FORMATS[export_format]
+            # Exported only when the button is clicked
+            st.download_button(f"Download Loan History ({export_format})",
+                               data=functools.partial(export_loan_history, fmt),
+                               file_name=f"loan_history.{fmt}", mime=mime)
+        else:
+            st.warning("This section is only accessible to admins.")
+    else:
+        st.warning("Please log in as an admin to access this section.")
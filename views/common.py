@@ -0,0 +1,109 @@
+"""Session handling, cached queries and static assets shared by several pages."""
+import functools
+import logging
+import os
+
+import streamlit as st
+
+import auth
+import db
+
+
+logger = logging.getLogger("harvestpay.ratelimit")
+
+# Images live outside the repository; point HARVESTPAY_ASSET_DIR at them
+ASSET_DIR = os.environ.get("HARVESTPAY_ASSET_DIR",
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets"))
+HOME_IMAGE = "home.jpeg"
+SIDEBAR_IMAGE = "sidebar.jpeg"
+
+
+@functools.lru_cache(maxsize=None)
+def asset_path(name):
+    """Returns the path of a static asset, or None if it is missing.
+
+    Resolved once per process rather than stat-ing the file on every rerun.
+    """
+    path = os.path.join(ASSET_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+# Behind reverse proxies every request arrives from the proxy's address; set
+# HARVESTPAY_TRUSTED_PROXIES to how many proxies append to the forwarded header
+CLIENT_IP_HEADER = os.environ.get("HARVESTPAY_CLIENT_IP_HEADER", "X-Forwarded-For")
+TRUSTED_PROXIES = int(os.environ.get("HARVESTPAY_TRUSTED_PROXIES", 0))
+
+
+def client_address(forwarded, peer, trusted_proxies=TRUSTED_PROXIES):
+    """Returns the client's address from the forwarded header and the peer address.
+
+    With ``trusted_proxies`` proxies in front of the app, the client is the
+    entry the outermost one appended, ``trusted_proxies`` from the right;
+    entries further left are whatever the client sent and are ignored.
+    """
+    if trusted_proxies > 0:
+        hops = [hop.strip() for hop in (forwarded or "").split(",") if hop.strip()]
+        return hops[-trusted_proxies] if len(hops) >= trusted_proxies else None
+    return peer
+
+
+def client_key():
+    """Identifies the browser client for rate limiting by its address, or returns None if it is unknown.
+
+    Streamlit reports no address for loopback peers, so behind a reverse
+    proxy on the same host every client is unknown until
+    HARVESTPAY_TRUSTED_PROXIES is set.  Per-client limits are skipped for
+    unknown clients: one shared key would let a single client lock out
+    everyone, and a per-session key is reset by opening a new session.
+    """
+    address = client_address(st.context.headers.get(CLIENT_IP_HEADER), st.context.ip_address)
+    if address:
+        return f"ip:{address}"
+    _warn_unknown_client()
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _warn_unknown_client():
+    logger.warning("Client address unknown; per-client rate limits are off. Behind a reverse proxy, "
+                   "set HARVESTPAY_TRUSTED_PROXIES (and HARVESTPAY_CLIENT_IP_HEADER if it is not %s).",
+                   CLIENT_IP_HEADER)
+
+
+def restore_session():
+    """Validates the signed session token, keeping the login keys in session state in step with it.
+
+    An HMAC check and expiry comparison per rerun; no database query or password hashing.
+    """
+    claims = auth.validate_session_token(st.session_state.get('session_token'))
+    if claims is None:
+        for key in ('logged_in', 'username', 'role', 'session_token'):
+            st.session_state.pop(key, None)
+        return None
+    st.session_state['logged_in'] = True
+    st.session_state['username'] = claims['username']
+    st.session_state['role'] = claims['role']
+    return claims
+
+
+CONTRIBUTOR_PAGE_SIZE = 20
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_contributor_page(interest, max_rate, sort, page):
+    """Returns one page of contributors and whether another page follows.
+
+    Cached across reruns and sessions; cleared whenever a contributor registers.
+    """
+    rows = db.search_contributors(interest, max_rate, sort, CONTRIBUTOR_PAGE_SIZE + 1, page * CONTRIBUTOR_PAGE_SIZE)
+    return rows[:CONTRIBUTOR_PAGE_SIZE], len(rows) > CONTRIBUTOR_PAGE_SIZE
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_review_page(after, limit, applicant, min_amount, max_amount, since, until, order):
+    """Returns one page of the admin review queue with its stored risk scores.
+
+    Scores are computed once when a loan is submitted, so reruns only read
+    them; cleared whenever a loan is submitted or decided.
+    """
+    return db.pending_loans_page(after, limit, applicant, min_amount, max_amount, since, until, order)
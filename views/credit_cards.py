@@ -0,0 +1,65 @@
+"""Card issuance for admins and card activation for farmers."""
+import sqlite3
+
+import streamlit as st
+
+import cards
+import db
+import notifications
+
+
+def render():
+    st.title("💳 Credit Cards")
+
+    if 'logged_in' in st.session_state and st.session_state['logged_in']:
+        role = st.session_state.get('role', None)
+        if role == "Admin":
+            st.subheader("Credit Card Issuance")
+            st.write(f"Approved loans awaiting a card: {db.count_loans_awaiting_card()}")
+            unmigrated = db.count_unmigrated_cards()
+            if unmigrated:
+                st.warning(f"{unmigrated} legacy card record(s) had a missing or duplicate card number and were "
+                           "not migrated; review them in the credit_cards_unmigrated table.")
+
+            if st.button("Issue Cards for Approved Loans"):
+                try:
+                    issued, emailed = cards.issue_cards_for_approved_loans(notify=notifications.queue_card_codes)
+                    st.success(f"{len(issued)} card(s) issued; {len(emailed)} activation code(s) sent by email.")
+                    unsent = [card for card in issued if card[0] not in emailed]
+                    if unsent:
+                        # Only hashes are stored, so this is the one chance to pass these codes on
+                        st.warning("These cardholders have no email on file. Give them their activation codes "
+                                   "in person; the codes are not shown again.")
+                        st.dataframe([{"Loan ID": loan_id, "Aadhaar": aadhaar, "Card Number": card_number,
+                                       "Activation Code": code, "Limit (₹)": limit_amount}
+                                      for loan_id, aadhaar, card_number, code, limit_amount in unsent],
+                                     hide_index=True)
+                except sqlite3.Error as e:
+                    st.error(f"Database error: {e}")
+
+        elif role == "Farmer":
+            st.subheader("Your Cards")
+            farmer_cards = db.cards_for_aadhaar(st.session_state['username'])
+            if farmer_cards:
+                st.dataframe([{"Card Number": cards.mask_card_number(card_number), "Limit (₹)": limit_amount,
+                               "Status": status, "Issued": issued_at, "Activated": activated_at}
+                              for card_number, limit_amount, status, issued_at, activated_at in farmer_cards],
+                             hide_index=True)
+
+                st.subheader("Card Activation")
+                inactive = [card[0] for card in farmer_cards if card[2] != "Active"]
+                if inactive:
+                    card_number = st.selectbox("Card", inactive, format_func=cards.mask_card_number)
+                    activation_code = st.text_input("Activation Code", type='password')
+                    if st.button("Activate Card"):
+                        activated, message = cards.activate_card(st.session_state['username'], card_number,
+                                                                 activation_code)
+                        (st.success if activated else st.error)(message)
+                else:
+                    st.info("All your cards are active.")
+            else:
+                st.info("No cards have been issued to you yet.")
+        else:
+            st.warning("This section is only accessible to farmers and admins.")
+    else:
+        st.warning("Please log in to access this section.")
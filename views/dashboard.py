@@ -0,0 +1,51 @@
+"""Admin dashboard drawn from the trigger-maintained loan summaries."""
+import datetime
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import db
+
+
+def render():
+    st.title("📊 Dashboard & Reporting")
+
+    if 'logged_in' in st.session_state and st.session_state['logged_in']:
+        role = st.session_state.get('role', None)
+        if role == "Admin":
+            # Every figure here reads the trigger-maintained summary tables, never loan_history itself
+            by_status = pd.DataFrame(db.summary_by_status(), columns=["Status", "Loans", "Amount (₹)"])
+
+            if by_status.empty:
+                st.info("No loan applications yet.")
+            else:
+                totals = by_status.set_index("Status")
+                metric1, metric2, metric3, metric4 = st.columns(4)
+                metric1.metric("Total Applications", int(totals["Loans"].sum()))
+                metric2.metric("Pending", int(totals["Loans"].get("Pending", 0)))
+                metric3.metric("Approved", int(totals["Loans"].get("Approved", 0)))
+                metric4.metric("Approved Amount", f"₹{totals['Amount (₹)'].get('Approved', 0):,.0f}")
+
+                chart1, chart2 = st.columns(2)
+                chart1.plotly_chart(px.bar(by_status, x="Status", y="Loans", color="Status",
+                                           title="Applications by Status"))
+                chart2.plotly_chart(px.pie(by_status, names="Status", values="Amount (₹)",
+                                           title="Amount by Status"))
+
+                days = st.slider("Days of History", 7, 365, 90, key="dashboard_days")
+                since = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+                by_day = pd.DataFrame(db.summary_by_day(since), columns=["Day", "Status", "Loans", "Amount (₹)"])
+                if not by_day.empty:
+                    st.plotly_chart(px.bar(by_day, x="Day", y="Loans", color="Status",
+                                           title="Applications per Day"))
+
+                by_contributor = pd.DataFrame(db.summary_by_contributor(),
+                                              columns=["Contributor", "Status", "Loans", "Amount (₹)"])
+                if not by_contributor.empty:
+                    st.plotly_chart(px.bar(by_contributor, x="Contributor", y="Amount (₹)", color="Status",
+                                           title="Lending by Contributor"))
+        else:
+            st.warning("This section is only accessible to admins.")
+    else:
+        st.warning("Please log in as an admin to access this section.")
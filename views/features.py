@@ -0,0 +1,37 @@
+"""Overview of the system's features."""
+import streamlit as st
+
+
+def render():
+    st.title("✨ System Features Overview")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown("#### 👤 User Registration")
+        st.write("Register new users with roles and details.")
+
+        st.markdown("#### 💸 Loan Application")
+        st.write("Apply for loans by specifying the amount and details.")
+
+        st.markdown("#### 🤖 Risk Assessment")
+        st.write("AI-based risk analysis for loan approval.")
+
+    with col2:
+        st.markdown("#### 💳 Credit Card Issuance")
+        st.write("Issue credit cards with set limits for users.")
+
+        st.markdown("#### 🔐 Card Activation")
+        st.write("Activate issued cards with one-time code.")
+
+        st.markdown("#### 👤 User Profile Management")
+        st.write("Manage and view user details.")
+
+    with col3:
+        st.markdown("#### 📚 Loan History")
+        st.write("Track and manage previous loan applications.")
+
+        st.markdown("#### 📝 Feedback System")
+        st.write("Allow users to submit feedback on services.")
+
+        st.markdown("#### 📊 Dashboard & Reporting")
+        st.write("View statistics and loan summary reports.")
@@ -0,0 +1,21 @@
+"""Feedback form; the email is sent by the outbox worker."""
+import sqlite3
+
+import streamlit as st
+
+import notifications
+
+
+def render():
+    st.title("📝 Feedback System")
+    feedback = st.text_area("Enter your feedback or suggestions:")
+    
+    if st.button("Submit Feedback"):
+        if feedback.strip():
+            try:
+                notifications.queue_feedback(feedback)
+                st.success("✅ Thank you for your feedback! It will be emailed to the admin shortly.")
+            except sqlite3.Error as e:
+                st.error(f"❌ Failed to save feedback. Please try again later. ({e})")
+        else:
+            st.error("⚠️ Please enter feedback before submitting.")
@@ -0,0 +1,27 @@
+"""The landing page."""
+import streamlit as st
+
+from views.common import HOME_IMAGE, asset_path
+
+
+def render():
+    home_img_path = asset_path(HOME_IMAGE)
+
+    if home_img_path:
+        st.image(home_img_path, use_container_width=True)
+    else:
+        st.error(f"❗ Home page image not found! Add {HOME_IMAGE} to the asset directory.")
+    st.title("🏡 Welcome to the Tenant Farmer Loan Management System")
+    st.write("### Features available:")
+    st.markdown(
+        """
+        - ✅ User Registration
+        - 💸 Loan Application
+        - 🤖 Risk Assessment
+        - 💳 Credit Card Issuance
+        - 🔐 Card Activation
+        - 👤 User Profile Management
+        - 📚 Loan History
+        - 📝 Feedback System
+        """
+    )
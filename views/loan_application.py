@@ -0,0 +1,135 @@
+"""Farmers' EMI calculator and loan application form."""
+import sqlite3
+
+import streamlit as st
+
+import credit_scoring
+import db
+import loan_math
+import matching
+from views.common import load_contributor_page, load_review_page
+
+
+def render():
+    st.title("💸 Loan Application")
+
+    # Check if the user is logged in as a farmer
+    if 'logged_in' in st.session_state and st.session_state['logged_in']:
+        role = st.session_state.get('role', None)
+        if role == "Farmer":
+            # Create columns for layout
+            col1, col2 = st.columns([1, 4])  # Calculator on the left, main content on the right
+
+            with col1:
+                st.subheader("EMI Calculator")
+                with st.expander("Calculate Your EMI"):
+                    calculator_loan_amount = st.number_input("Loan Amount (₹)", min_value=1000.0, step=100.0, key="calculator_amount")
+                    calculator_interest_rate = st.number_input("Interest Rate (%)", min_value=0.0, max_value=20.0, step=0.1, key="calculator_rate")
+                    calculator_repayment_period = st.selectbox("Repayment Period", list(loan_math.REPAYMENT_MONTHS), key="calculator_period")
+
+                    if st.button("Calculate EMI", key="calculate_emi"):
+                        months = loan_math.REPAYMENT_MONTHS[calculator_repayment_period]
+                        schedule = loan_math.amortization_schedule(calculator_loan_amount, calculator_interest_rate, months)
+                        emi = schedule["EMI (₹)"].iloc[0]
+
+                        st.write(f"EMI: ₹{emi}")
+                        st.write(f"Total Interest: ₹{schedule['Interest (₹)'].sum():,.2f}")
+                        st.dataframe(schedule, hide_index=True)
+
+                        # Compare neighbouring rates across every tenure in one vectorized call
+                        st.write("Rate / Tenure Comparison (EMI ₹)")
+                        rates = sorted({max(calculator_interest_rate + step, 0.0) for step in (-2, -1, 0, 1, 2)})
+                        st.dataframe(loan_math.emi_grid(calculator_loan_amount, rates, loan_math.REPAYMENT_MONTHS))
+
+            with col2:
+                st.subheader("Apply for a Loan")
+
+                # Loan Details
+                purpose_of_loan = st.text_input("Purpose of Loan")
+                loan_amount = st.number_input("Loan Amount (₹)", min_value=1000.0, step=100.0)
+                repayment_period = st.selectbox("Repayment Period", list(loan_math.REPAYMENT_MONTHS))
+
+                # Income and Financial Details
+                annual_income = st.number_input("Annual Income (₹)", min_value=0.0)
+                existing_loans = st.number_input("Existing Loan Amount (₹)", min_value=0.0)
+                collateral_details = st.text_area("Collateral Details (if applicable)")
+
+                # Display Contributors with Preferred Rates of Interest
+                st.subheader("Select a Contributor")
+                filter_col1, filter_col2, filter_col3 = st.columns(3)
+                interest_filter = filter_col1.text_input("Filter by Interest", key="contributor_interest")
+                max_rate_filter = filter_col2.slider("Maximum Rate (%)", 0.0, 20.0, 20.0, 0.1, key="contributor_max_rate")
+                sort_by = filter_col3.selectbox("Sort by", ["Rate", "Username"], key="contributor_sort")
+                page = st.number_input("Page", min_value=1, step=1, key="contributor_page")
+
+                contributors, has_more = load_contributor_page(interest_filter.strip(), max_rate_filter,
+                                                               sort_by.lower(), int(page) - 1)
+
+                if contributors:
+                    # The join already returns each contributor's rate, so no second lookup is needed
+                    contributor_options = {contributor[0]: contributor for contributor in contributors}
+
+                    selected_contributor = st.selectbox(
+                        "Choose a Contributor", list(contributor_options.keys()),
+                        format_func=lambda name: "{} - {} - {} - Rate: {}%".format(*contributor_options[name]))
+
+                    preferred_rate = contributor_options[selected_contributor][3]
+                    st.write(f"Selected Contributor's Preferred Rate of Interest: {preferred_rate}%")
+                    if has_more:
+                        st.caption("More contributors are available on the next page.")
+                else:
+                    selected_contributor = None
+                    st.error("No contributors available.")
+
+                # Loan Approval Process
+                st.subheader("Loan Approval Process")
+                st.write(
+                    """
+                    - Your loan application will be reviewed by the bank.
+                    - A field officer may visit your farm to verify details.
+                    - The bank will assess your creditworthiness based on income, collateral, and repayment capacity.
+                    - You will be notified of the approval status via email or SMS.
+                    """
+                )
+
+                # Loan Repayment Conditions
+                st.subheader("Loan Repayment Conditions")
+                st.write(
+                    """
+                    - Repayments must be made as per the agreed schedule.
+                    - Late payments may attract penalties.
+                    - Early repayment options are available but may include pre-closure charges.
+                    """
+                )
+
+                # Submit Loan Application
+                if st.button("Submit Loan Application"):
+                    if purpose_of_loan and loan_amount > 0 and annual_income > 0:
+                        try:
+                            # Assess risk once at submission; admins read the stored score
+                            applicant = st.session_state['username']
+                            months = loan_math.REPAYMENT_MONTHS[repayment_period]
+                            credit_score, risk = credit_scoring.assess_application(
+                                loan_amount, annual_income, existing_loans, collateral_details.strip(), months,
+                                credit_scoring.land_score(applicant))
+                            loan_id = db.insert_loan(applicant, purpose_of_loan, loan_amount, "Pending",
+                                                     annual_income=annual_income, existing_loans=existing_loans,
+                                                     collateral=collateral_details.strip() or None,
+                                                     repayment_months=months, credit_score=credit_score, risk=risk,
+                                                     contributor=selected_contributor)
+                            fills = matching.match_loan(loan_id)
+                            load_review_page.clear()
+                            st.success("✅ Your loan application has been submitted successfully!")
+                            if fills:
+                                st.info(f"Funding reserved from {len(fills)} contributor(s) at a blended rate of "
+                                        f"{matching.blended_rate(fills):.2f}%.")
+                            else:
+                                st.info("Contributors will be matched to your loan as capital becomes available.")
+                        except sqlite3.Error as e:
+                            st.error(f"Database error: {e}")
+                    else:
+                        st.error("❗ Please fill out all required fields correctly.")
+        else:
+            st.warning("This section is only accessible to farmers.")
+    else:
+        st.warning("Please log in as a farmer to access this section.")
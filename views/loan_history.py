@@ -0,0 +1,47 @@
+"""A farmer's own loans, newest first."""
+import streamlit as st
+
+import db
+
+
+def render():
+    st.title("📚 Loan History")
+
+    if 'logged_in' in st.session_state and st.session_state['logged_in']:
+        if st.session_state.get('role', None) == "Farmer":
+            aadhaar = st.session_state['username']
+            totals = db.loan_totals(aadhaar)
+            metric_cols = st.columns(3)
+            for col, status in zip(metric_cols, ["Pending", "Approved", "Rejected"]):
+                count, total = totals.get(status, (0, 0))
+                col.metric(f"{status} Loans", count, f"₹{total:,.0f}", delta_color="off")
+
+            page_size = st.selectbox("Loans per Page", [10, 20, 50], index=1, key="history_page_size")
+            # Keyset pagination, newest first: a stack of "last loan seen" cursors
+            if st.session_state.get('history_filters') != (aadhaar, page_size):
+                st.session_state['history_filters'] = (aadhaar, page_size)
+                st.session_state['history_cursors'] = [None]
+            cursors = st.session_state['history_cursors']
+
+            loans = db.loan_history_page(aadhaar, cursors[-1], page_size + 1)
+            has_next = len(loans) > page_size
+            loans = loans[:page_size]
+            if loans:
+                st.dataframe([{"Application ID": loan.id, "Submitted": loan.Date, "Amount (₹)": loan.amount,
+                               "Repayment (months)": loan.repayment_months, "Status": loan.status,
+                               "Score": loan.credit_score, "Risk": loan.risk, "Contributor": loan.contributor}
+                              for loan in loans], hide_index=True)
+            else:
+                st.info("You have not applied for any loans yet.")
+
+            nav_prev, nav_next = st.columns(2)
+            if nav_prev.button("Newer Loans", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+            if nav_next.button("Older Loans", disabled=not has_next):
+                cursors.append(db.history_cursor(loans[-1]))
+                st.rerun()
+        else:
+            st.warning("This section is only accessible to farmers.")
+    else:
+        st.warning("Please log in to access this section.")
@@ -0,0 +1,25 @@
+"""Username and password login."""
+import streamlit as st
+
+import auth
+import ratelimit
+from views.common import client_key, restore_session
+
+
+def render():
+    st.title("User Login")
+    username = st.text_input("Username")
+    password = st.text_input("Password", type='password')
+
+    if st.button("Login"):
+        user, retry_after = auth.login(username, password, client_key())
+        if retry_after:
+            st.error(f"Too many login attempts. Try again in {ratelimit.describe_wait(retry_after)}.")
+        elif user:
+            st.success(f"Welcome back, {user.full_name}! You are logged in as {user.role}.")
+            # Store a signed session token; other pages validate it without hitting the database
+            st.session_state['session_token'] = auth.issue_session_token(username, user.role, user.full_name)
+            restore_session()
+
+        else:
+            st.error("Invalid username or password.")
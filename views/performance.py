@@ -0,0 +1,55 @@
+"""Admins' view of rerun latency, slow queries and the metrics export."""
+import pandas as pd
+import streamlit as st
+
+import instrumentation
+import notifications
+
+
+def render():
+    st.title("⏱️ Performance")
+
+    if 'logged_in' in st.session_state and st.session_state['logged_in']:
+        if st.session_state.get('role', None) == "Admin":
+            st.caption("Measured in this app process since it started.")
+
+            st.subheader("Rerun Latency by Page")
+            reruns = instrumentation.rerun_summary()
+            if reruns:
+                st.dataframe(pd.DataFrame([(page, *stats) for page, stats in reruns.items()],
+                                          columns=["Page", "Reruns", "p50 (ms)", "p95 (ms)", "Queries per Rerun"])
+                             .round(1), hide_index=True)
+            else:
+                st.info("No reruns recorded yet.")
+
+            st.subheader("Slowest Queries")
+            st.caption(f"Statements slower than {instrumentation.SLOW_QUERY_MS:g} ms, with literals redacted.")
+            slow = instrumentation.slow_queries()
+            if slow:
+                st.dataframe(pd.DataFrame(slow, columns=["Statement", "Count", "Mean (ms)", "Max (ms)"]).round(1),
+                             hide_index=True)
+            else:
+                st.info("No slow queries recorded.")
+
+            st.subheader("Timed Operations")
+            operations = [(name.removeprefix("harvestpay_").removesuffix("_seconds"),
+                           ", ".join(f"{key}={value}" for key, value in labels), count, mean_ms)
+                          for (name, labels), (count, mean_ms) in sorted(instrumentation.operation_summary().items())]
+            if operations:
+                st.dataframe(pd.DataFrame(operations, columns=["Operation", "Labels", "Count", "Mean (ms)"]).round(2),
+                             hide_index=True)
+
+            outbox = notifications.metrics()
+            outbox_cols = st.columns(3)
+            outbox_cols[0].metric("Emails Queued", outbox["queue_depth"])
+            outbox_cols[1].metric("Send p50 (ms)", f"{outbox['send_latency_p50_ms']:.0f}")
+            outbox_cols[2].metric("Send p99 (ms)", f"{outbox['send_latency_p99_ms']:.0f}")
+
+            exposition = instrumentation.render_prometheus()
+            with st.expander("Prometheus Metrics"):
+                st.code(exposition, language="text")
+            st.download_button("Download Metrics", data=exposition, file_name="harvestpay.prom", mime="text/plain")
+        else:
+            st.warning("This section is only accessible to admins.")
+    else:
+        st.warning("Please log in as an admin to access this section.")
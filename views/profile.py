@@ -0,0 +1,63 @@
+"""Profile and password management."""
+import sqlite3
+
+import streamlit as st
+
+import auth
+import db
+
+
+def render():
+    st.title("👤 User Profile")
+
+    if 'logged_in' in st.session_state and st.session_state['logged_in']:
+        username = st.session_state['username']
+        profile = db.get_user(username)
+        if profile is None:
+            st.error("Your account could not be found.")
+        else:
+            st.write(f"Username: {profile.username}")
+            st.write(f"Role: {profile.role}" + (f" ({profile.org_role})" if profile.org_role else ""))
+            if profile.role == "Contributor":
+                capital = db.contributor_capital(username)
+                if capital:
+                    capacity, committed = capital
+                    capital_col1, capital_col2 = st.columns(2)
+                    capital_col1.metric("Committed Capital", f"₹{committed:,.0f}")
+                    capital_col2.metric("Available to Lend",
+                                        "No limit" if capacity is None else f"₹{max(capacity - committed, 0):,.0f}")
+
+            with st.form("profile_form"):
+                full_name = st.text_input("Full Name", value=profile.full_name or "")
+                email = st.text_input("Email", value=profile.email or "")
+                phone = st.text_input("Contact Number", value=profile.phone or "")
+                changes = {"full_name": full_name, "email": email or None, "phone": phone}
+                if profile.role == "Farmer":
+                    changes["address"] = st.text_area("Address", value=profile.address or "")
+                    changes["farming_type"] = st.text_input("Farming Type", value=profile.farming_type or "")
+                elif profile.role == "Contributor":
+                    changes["interests"] = st.text_area("Interests in Contributing", value=profile.interests or "")
+                if st.form_submit_button("Save Profile"):
+                    if full_name and phone:
+                        try:
+                            db.update_profile(username, **changes)
+                            st.success("Profile updated successfully!")
+                        except sqlite3.Error as e:
+                            st.error(f"Database error: {e}")
+                    else:
+                        st.error("Full name and contact number are required.")
+
+            with st.form("password_form", clear_on_submit=True):
+                st.subheader("Change Password")
+                current_password = st.text_input("Current Password", type='password')
+                new_password = st.text_input("New Password", type='password')
+                confirm_password = st.text_input("Confirm New Password", type='password')
+                if st.form_submit_button("Change Password"):
+                    if not new_password or new_password != confirm_password:
+                        st.error("The new passwords do not match.")
+                    elif auth.change_password(username, current_password, new_password):
+                        st.success("Password changed successfully!")
+                    else:
+                        st.error("Current password is incorrect.")
+    else:
+        st.warning("Please log in to access this section.")
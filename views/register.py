@@ -0,0 +1,122 @@
+"""Registration for farmers, contributors and admins."""
+import sqlite3
+
+import streamlit as st
+
+import auth
+import db
+import documents
+import ratelimit
+from views.common import client_key, load_contributor_page
+
+
+def registration_allowed(username):
+    """Checks that the username is free and this client may register again, showing an error if not."""
+    if not auth.username_available(username):
+        st.error(f"The username '{username}' is already taken.")
+        return False
+    client = client_key()
+    allowed, retry_after = ratelimit.registrations.hit(client) if client else (True, 0.0)
+    if not allowed:
+        st.error(f"Too many registrations from this device. Try again in {ratelimit.describe_wait(retry_after)}.")
+        return False
+    return True
+
+
+def render():
+    st.title("User Registration")
+
+    role = st.selectbox("Select Role", ["Farmer", "Contributor", "Admin"])
+
+    full_name = st.text_input("Full Name")
+    username = st.text_input("Username")
+    if username:
+        # Answered from an in-memory cache after the first lookup of a name
+        if auth.username_available(username):
+            st.caption("✅ Username is available")
+        else:
+            st.caption("❌ Username is already taken")
+    password = st.text_input("Password", type='password')
+
+    if role == "Farmer":
+        age = st.number_input("Age", min_value=18, max_value=100)
+        gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+        phone = st.text_input("Phone Number")
+        email = st.text_input("Email (optional, for loan status updates)")
+        address = st.text_area("Address")
+        land_proof = st.file_uploader("Land Ownership Proof")
+        bank_details = st.text_input("Bank Account Details")
+        farming_type = st.text_input("Type of Farming")
+        credit_history = st.text_area("Credit History")
+
+        if st.button("Register Farmer"):
+            if not (full_name and username and password and phone and age and gender and address and land_proof and bank_details and farming_type and credit_history):
+                st.error("Please fill out all the required fields.")
+            elif registration_allowed(username):
+                try:
+                    hashed_pw = auth.hash_password(password)  # hashed only on submit
+                    db.insert_user(full_name=full_name, email=email or None, phone=phone, age=age, gender=gender,
+                                   address=address,
+                                   land_proof=documents.store(land_proof, land_proof.name, land_proof.type),
+                                   bank_details=bank_details, farming_type=farming_type,
+                                   credit_history=credit_history, role=role, username=username, password=hashed_pw)
+                    auth.mark_username_taken(username)
+                    st.success("Farmer registered successfully! Please login.")
+                except sqlite3.Error as e:
+                    st.error(f"Database error: {e}")
+                except OSError as e:
+                    st.error(f"Could not store the uploaded document: {e}")
+
+    elif role == "Contributor":
+        email = st.text_input("Email")
+        phone = st.text_input("Phone Number")
+        verification_doc = st.file_uploader("Verification Document")
+        interests = st.text_area("Areas of Interest")
+        agreement = st.checkbox("I agree to the terms and compliance")
+        preferred_rate = st.number_input("Preferred Rate of Interest (%)", min_value=0.0, max_value=20.0, step=0.1)
+        capacity = st.number_input("Capital Available to Lend (₹)", min_value=0.0, value=100000.0, step=1000.0)
+
+        if st.button("Register Contributor"):
+            if not (full_name and username and password and phone and email and verification_doc and interests and agreement):
+                st.error("Please fill out all required fields.")
+            elif registration_allowed(username):
+                if agreement:
+                    try:
+                        hashed_pw = auth.hash_password(password)
+                        # Insert contributor details and preferred rate in one transaction
+                        db.register_contributor(preferred_rate, capacity, full_name=full_name, email=email, phone=phone,
+                                                verification_doc=documents.store(verification_doc, verification_doc.name,
+                                                                                 verification_doc.type),
+                                                interests=interests, agreement=str(agreement), role=role,
+                                                username=username, password=hashed_pw)
+                        auth.mark_username_taken(username)
+                        load_contributor_page.clear()
+                        st.success("Contributor registered successfully! Please login.")
+                    except sqlite3.Error as e:
+                        st.error(f"Database error: {e}")
+                    except OSError as e:
+                        st.error(f"Could not store the uploaded document: {e}")
+                else:
+                    st.error("You must agree to the terms and compliance.")
+
+    elif role == "Admin":
+        email = st.text_input("Email")
+        contact_number = st.text_input("Contact Number")
+        org_role = st.text_input("Role in Organization")
+        gov_id = st.file_uploader("Government ID Proof")
+
+        if st.button("Register Admin"):
+            if not (full_name and username and password and contact_number and email and org_role and gov_id):
+                st.error("Please fill out all required fields.")
+            elif registration_allowed(username):
+                try:
+                    hashed_pw = auth.hash_password(password)
+                    db.insert_user(full_name=full_name, email=email, phone=contact_number, org_role=org_role,
+                                   gov_id=documents.store(gov_id, gov_id.name, gov_id.type), role=role,
+                                   username=username, password=hashed_pw)
+                    auth.mark_username_taken(username)
+                    st.success("Admin registered successfully! Please login.")
+                except sqlite3.Error as e:
+                    st.error(f"Database error: {e}")
+                except OSError as e:
+                    st.error(f"Could not store the uploaded document: {e}")
@@ -0,0 +1,146 @@
+"""Admins' loan review queue, contributor matching and portfolio projection."""
+import functools
+import sqlite3
+
+import pandas as pd
+import streamlit as st
+
+import db
+import documents
+import loan_math
+import matching
+import notifications
+from views.common import load_review_page
+
+
+def render():
+    st.title("🔍 Loan Verification")
+
+    # Check if the user is logged in as an admin
+    if 'logged_in' in st.session_state and st.session_state['logged_in']:
+        role = st.session_state.get('role', None)
+        if role == "Admin":
+            st.subheader("Manage Loan Applications")
+
+            if 'queue_flash' in st.session_state:
+                st.success(st.session_state.pop('queue_flash'))
+
+            # Queue filters
+            filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
+            applicant_filter = filter_col1.text_input("Applicant", key="queue_applicant")
+            min_amount = filter_col2.number_input("Min Amount (₹)", min_value=0.0, step=1000.0, key="queue_min_amount")
+            max_amount = filter_col3.number_input("Max Amount (₹)", min_value=0.0, step=1000.0, key="queue_max_amount",
+                                                  help="Leave at 0 for no upper limit.")
+            submitted = filter_col4.date_input("Submitted Between", value=(), key="queue_dates")
+            sort_col, triage_col, size_col = st.columns(3)
+            sort_by = sort_col.selectbox("Sort by", ["Oldest First", "Highest Risk First"], key="queue_sort")
+            auto_triage = triage_col.checkbox("Pre-fill decisions from risk (approve Low, reject High)",
+                                              key="queue_auto_triage")
+            page_size = size_col.selectbox("Applications per Page", [25, 50, 100], key="queue_page_size")
+
+            order = "risk" if sort_by == "Highest Risk First" else "oldest"
+            since = submitted[0].isoformat() if len(submitted) > 0 else None
+            until = submitted[1].isoformat() if len(submitted) > 1 else None
+            filters = (applicant_filter.strip(), min_amount, max_amount, since, until, page_size, order)
+
+            # Keyset pagination: a stack of "last row seen" cursors, reset whenever the filters change
+            if st.session_state.get('queue_filters') != filters:
+                st.session_state['queue_filters'] = filters
+                st.session_state['queue_cursors'] = [None]
+            cursors = st.session_state['queue_cursors']
+
+            pending_applications = load_review_page(cursors[-1], page_size + 1, applicant_filter.strip() or None,
+                                                    min_amount or None, max_amount or None, since, until, order)
+            has_next = len(pending_applications) > page_size
+            pending_applications = pending_applications[:page_size]
+
+            if pending_applications:
+                triage = {"Low": "Approve", "High": "Reject"} if auto_triage else {}
+                review_queue = [{"Application ID": application.id, "Aadhaar": application.aadhaar,
+                                 "Name": application.name, "Amount (₹)": application.amount,
+                                 "Submitted": application.Date, "Score": application.credit_score,
+                                 "Risk": application.risk, "Decision": triage.get(application.risk)}
+                                for application in pending_applications]
+                edited_queue = st.data_editor(
+                    review_queue, hide_index=True,
+                    key=f"queue_editor_{cursors[-1]}_{auto_triage}_{st.session_state.get('queue_version', 0)}",
+                    disabled=["Application ID", "Aadhaar", "Name", "Amount (₹)", "Submitted", "Score", "Risk"],
+                    column_config={"Decision": st.column_config.SelectboxColumn(
+                        "Decision", options=["Approve", "Reject"])})
+
+                decision_status = {"Approve": "Approved", "Reject": "Rejected"}
+                decisions = [(row["Application ID"], decision_status[row["Decision"]])
+                             for row in edited_queue if row["Decision"]]
+
+                if st.button(f"Apply {len(decisions)} Decision(s)", disabled=not decisions):
+                    try:
+                        applied = db.decide_loans(decisions, st.session_state['username'],
+                                                  notify=notifications.queue_loan_decisions)
+                        load_review_page.clear()
+                        st.session_state['queue_flash'] = f"{len(applied)} application(s) updated successfully!"
+                        st.session_state['queue_version'] = st.session_state.get('queue_version', 0) + 1
+                        st.rerun()
+                    except sqlite3.Error as e:
+                        st.error(f"Database error: {e}")
+            else:
+                st.info("No pending applications found.")
+
+            nav_prev, nav_next = st.columns(2)
+            if nav_prev.button("Previous Page", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+            if nav_next.button("Next Page", disabled=not has_next):
+                cursors.append(db.review_cursor(pending_applications[-1], order))
+                st.rerun()
+
+            with st.expander("Contributor Matching"):
+                st.write("Split every unfunded pending loan across contributors, cheapest rate first, "
+                         "starting with the contributor the farmer chose.")
+                match_max_rate = st.slider("Maximum Contributor Rate (%)", 0.0, 20.0, 20.0, 0.1, key="match_max_rate")
+                if st.button("Auto-match Pending Queue"):
+                    try:
+                        matched, unmatched = matching.match_pending(match_max_rate)
+                        st.success(f"{matched} loan(s) funded; {unmatched} still awaiting contributor capital.")
+                    except sqlite3.Error as e:
+                        st.error(f"Database error: {e}")
+                shown = [application.id for application in pending_applications]
+                funding = db.loan_allocations(shown)
+                if funding:
+                    st.dataframe(pd.DataFrame(funding, columns=["Application ID", "Contributor", "Amount (₹)",
+                                                                "Rate (%)"]), hide_index=True)
+
+            with st.expander("Applicant Documents"):
+                applicants = sorted({application.aadhaar for application in pending_applications})
+                if applicants:
+                    applicant = st.selectbox("Applicant", applicants, key="documents_applicant")
+                    applicant_documents = db.user_documents(applicant)
+                    for label, digest, filename, content_type, size in applicant_documents:
+                        st.write(f"{label}: {filename} ({size / 1024:,.0f} KB)")
+                        thumb = documents.thumbnail(digest)
+                        if thumb:
+                            st.image(thumb)
+                        # Read from disk only when the admin actually clicks download
+                        st.download_button("Download", data=functools.partial(documents.read, digest),
+                                           file_name=filename, mime=content_type, key=f"download_{label}_{digest}")
+                    if not applicant_documents:
+                        st.info("No stored documents for this applicant.")
+                else:
+                    st.info("No applicants on this page.")
+
+            with st.expander("Recent Decisions"):
+                for loan_id, status, decided_by, decided_at in db.recent_decisions():
+                    st.write(f"{decided_at}: application {loan_id} {status.lower()} by {decided_by}")
+
+            with st.expander("Portfolio Cash-flow Projection"):
+                projection_rate = st.number_input("Assumed Interest Rate (%)", min_value=0.0, max_value=20.0,
+                                                  value=loan_math.DEFAULT_PORTFOLIO_RATE, step=0.1,
+                                                  key="projection_rate")
+                projection_months = st.slider("Months Ahead", 6, 60, 24, key="projection_months")
+                if st.button("Project Collections", key="project_collections"):
+                    projection = loan_math.portfolio_projection(projection_rate, projection_months)
+                    st.bar_chart(projection, x="Month", y="Collections (₹)")
+                    st.write(f"Total expected collections: ₹{projection['Collections (₹)'].sum():,.2f}")
+        else:
+            st.warning("This section is only accessible to admins.")
+    else:
+        st.warning("Please log in as an admin to access this section.")